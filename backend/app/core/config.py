@@ -13,11 +13,100 @@ class Settings(BaseSettings):
     CORS_ALLOWED_ORIGINS: str = "http://localhost:3000,http://127.0.0.1:3000"
 
     # --- REMOVED/OPTIONAL KEYS ---
-    # GOOGLE_API_KEY: str # Not needed if you are not using Gemini Embeddings
-    # PINECONE_API_KEY: str # Not needed if you are not using Pinecone DB
+    GOOGLE_API_KEY: str = ""     # Optional: enables the Gemini provider (router)
+    HF_API_KEY: str = ""         # Optional: enables the Hugging Face provider...
+    HF_INFERENCE_URL: str = ""   # ...for this model id / endpoint
 
-    RATE_LIMIT: str = "5/minute"
-    DAILY_QUOTA: int = 50
+    # --- ADMISSION CONTROL ---
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT: str = "5/minute"          # Chat messages per session (token bucket: burst of 5, refills over the period)
+    IP_RATE_LIMIT: str = "20/minute"      # Chat + upload requests per client IP
+    UPLOAD_RATE_LIMIT: str = "10/hour"    # Uploads per client IP
+    DAILY_QUOTA: int = 50                 # Chat messages per client IP per UTC day
+    QUOTA_PATH: str = "data/quota.sqlite3"  # Daily counts survive restarts; "" = memory only
+    QUOTA_FLUSH_SECONDS: float = 5.0      # Increments are batched to disk at most this often
+    TRUSTED_PROXY_HOPS: int = 0           # Proxies in front of the app that append to X-Forwarded-For (1 behind Render); 0 = socket peer
+    LLM_QUEUE_SIZE: int = 64              # Chats allowed to wait for an LLM slot; beyond that -> 503
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 10.0  # Longest wait for a slot before -> 503
+
+    # --- STARTUP ---
+    WARM_UP_ON_STARTUP: bool = True  # Build clients in the background at startup instead of on the first request
+
+    # --- CONCURRENCY (per worker process) ---
+    LLM_MAX_CONCURRENCY: int = 32  # Groq completions in flight at once
+    DB_MAX_CONCURRENCY: int = 16   # Supabase calls running in the thread pool
+    PDF_WORKERS: int = 2           # Processes for PDF text extraction
+
+    # --- LLM PROVIDERS (gateway) ---
+    LLM_MODEL: str = "llama-3.3-70b-versatile"
+    LLM_FALLBACK_MODEL: str = "llama-3.1-8b-instant"  # Used when the primary is failing/slow; "" disables
+    LLM_TIMEOUT_SECONDS: float = 30.0    # Per-attempt deadline (to the first token when streaming)
+    LLM_STREAM_IDLE_SECONDS: float = 15.0   # Longest gap between streamed tokens before giving up
+    LLM_STREAM_TIMEOUT_SECONDS: float = 120.0  # Whole streamed answer
+    LLM_HEDGE_PERCENTILE: float = 0.95   # Hedge to the next provider after this latency percentile; 0 disables
+    BREAKER_WINDOW: int = 20             # Calls tracked per provider
+    BREAKER_ERROR_RATE: float = 0.5      # Open the circuit at this rolling error rate...
+    BREAKER_MIN_CALLS: int = 5           # ...once at least this many calls were seen
+    BREAKER_COOLDOWN_SECONDS: float = 30.0
+
+    # --- UPLOADS ---
+    UPLOAD_SPOOL_BYTES: int = 256 * 1024  # Larger uploads are streamed to a temp file and mmap'd
+    BATCH_MAX_FILES: int = 20      # Files per POST /upload/batch
+    BATCH_WORKERS: int = 4         # Batch files processed at once (PDF parsing is further capped by PDF_WORKERS)
+    BATCH_QUEUE_FILES: int = 200   # Files waiting across all batch jobs; beyond this new batches get a 503
+
+    # --- WRITE-BEHIND CHAT PERSISTENCE ---
+    TURN_FLUSH_INTERVAL_MS: int = 200  # Max time a turn waits before its batch is written
+    TURN_BATCH_SIZE: int = 100         # Turns per batched Supabase write
+    TURN_RETRY_BACKOFF_MS: int = 500   # First retry delay after a failed batch; doubles per consecutive failure
+
+    # --- RETRIEVAL ---
+    CLAUSE_INDEX_DIR: str = "data/clause_index"  # Local BM25 postings, one JSON per document
+
+    VECTOR_INGEST: bool = False                  # Chunk + embed uploads into the vector store (nothing in chat reads it yet)
+    VECTOR_INDEX_DIR: str = "data/vector_index"  # Embedded vector store, one folder per document
+    EMBEDDER: str = "hashing"                    # "hashing[:dim]" or "sentence-transformers:<model>"
+    CHUNK_CHARS: int = 1500          # Target chunk size (whole clauses are packed up to this)
+    CHUNK_OVERLAP_CHARS: int = 200   # Tail of the previous chunk repeated at the start of the next
+    INGEST_WORKERS: int = 2          # Background ingestion tasks per process
+
+    # --- PROMPT ASSEMBLY ---
+    PROMPT_TOKEN_BUDGET: int = 8000   # Input tokens per completion (system + history + documents + question)
+    HISTORY_TOKEN_BUDGET: int = 1000  # Cap on the history slice; unused room goes to documents
+    COMPARE_MIN_SIMILARITY: float = 0.35  # Clauses less alike than this are reported as present in one document only
+    COMPARE_CLAUSE_CHARS: int = 700       # Per-side clause excerpt in a comparison prompt (the diff is always whole)
+
+    # --- CONVERSATION MEMORY (sessions.summary / sessions.recent) ---
+    HISTORY_TAIL_MESSAGES: int = 4    # Messages kept verbatim; older ones live on in the rolling summary
+    SUMMARY_FOLD_MESSAGES: int = 4    # Fold into the summary once this many have left the tail (one LLM call)
+    SUMMARY_MAX_TOKENS: int = 250     # Length cap for the summary
+    RECENT_MESSAGE_CHARS: int = 2000  # Per-message cap in the stored tail
+
+    # --- ANSWER CACHE ---
+    ANSWER_CACHE_BACKEND: str = "memory"      # "memory" (per process), "sqlite" (shared on host) or "off"
+    ANSWER_CACHE_PATH: str = "data/answer_cache.sqlite3"
+    ANSWER_CACHE_TTL_SECONDS: int = 24 * 3600
+    ANSWER_CACHE_MAX_ENTRIES: int = 5000
+    ANSWER_CACHE_HISTORY_MESSAGES: int = 2    # Recent messages that must match for a hit
+
+    # --- PII REDACTION ---
+    PII_GAZETTEER_PATH: str = ""  # Optional extra names file (one per line) for the local redactor
+
+    # --- QUERY ROUTING ---
+    ROUTER_MODEL_PATH: str = ""      # Offline-trained weights (JSON); empty = built-in lexicon weights
+    ROUTER_CONFIDENCE: float = 0.8   # Below this the local router escalates to the remote LLM
+    ROUTER_CACHE_SIZE: int = 2048    # Normalized query -> routing decision LRU
+
+    # --- DOCUMENT CACHE ---
+    DOC_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # In-process LRU for document text
+    DOC_CACHE_TTL_SECONDS: int = 3600
+
+    # --- DOCUMENT STORAGE ---
+    DOC_STORAGE_FORMAT: int = 2  # 2 = compressed blocks + meta (app.utils.doc_codec); 1 = plain `content`
+
+    # --- OBSERVABILITY ---
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" (one object per line) or "text"
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,124 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Minimal Prometheus-compatible registry (text exposition format 0.0.4).
+# Per-process like prometheus_client's default registry: scrape each worker.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+CHAR_BUCKETS = (1000, 5000, 10000, 25000, 50000, 100000, 250000)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names, values, le=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels.get(n, "") for n in self.labels), 0.0)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_label_str(self.labels, key)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(labels.get(n, "") for n in self.labels))
+        return series[-1] if series else 0
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                yield f"{self.name}_bucket{_label_str(self.labels, key, bound)} {cumulative}"
+            yield f"{self.name}_bucket{_label_str(self.labels, key, '+Inf')} {series[-1]}"
+            yield f"{self.name}_sum{_label_str(self.labels, key)} {series[-2]}"
+            yield f"{self.name}_count{_label_str(self.labels, key)} {series[-1]}"
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+# --- Application metrics ---
+
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Latency of one pipeline stage", ("stage",))
+STAGE_ERRORS = Counter("stage_errors_total", "Stages that raised", ("stage",))
+PROMPT_TOKENS = Histogram("llm_prompt_tokens", "Estimated input tokens per completion", ("kind",), TOKEN_BUCKETS)
+PROMPT_CHARS = Histogram("llm_prompt_chars", "Prompt size in characters per completion", ("kind",), CHAR_BUCKETS)
+PROVIDER_CALLS = Counter("llm_provider_calls_total", "Provider attempts by outcome", ("provider", "outcome"))
+PROVIDER_SECONDS = Histogram("llm_provider_duration_seconds", "Provider latency (successful calls)", ("provider",))
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requests shed before doing work", ("reason",))
+UPLOAD_BYTES = Histogram("upload_size_bytes", "Uploaded file size", ("kind",),
+                         (16_384, 65_536, 262_144, 524_288, 1_048_576, 2_097_152))
+
+
+async def timed(stage: str, awaitable):
+    """`await timed("stage", coro)`: span() for a single awaitable, e.g. inside gather()."""
+    with span(stage):
+        return await awaitable
+
+
+@contextmanager
+def span(stage: str):
+    """Times a block into stage_duration_seconds{stage=...}; counts it in stage_errors_total if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
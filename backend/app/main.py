@@ -1,8 +1,40 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
+from app.core.logger import setup_logging, stop_logging
+from app.core.metrics import HTTP_SECONDS, render_metrics
 from app.routes import upload, chat
-app = FastAPI(title=settings.PROJECT_NAME)
+from app.services.container import services
+from app.services.admission import admission, AdmissionRejected
+from app.services.ingestion import ingestion_pipeline
+from app.utils.pdf_parser import shutdown_executor
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients and SDKs are built in a worker thread so the port binds right away;
+    # a request arriving before warm-up finishes builds whatever it needs itself
+    warm_up = asyncio.create_task(asyncio.to_thread(services.warm_up)) if settings.WARM_UP_ON_STARTUP else None
+    yield
+    if warm_up is not None:
+        await asyncio.gather(warm_up, return_exceptions=True)
+    # Flush pending chat turns, finish queued batch files and ingestion before the worker exits
+    if services.chat_ready:
+        await services.chat.writer.stop()
+        await services.chat.memory.stop()
+    if services.batches_ready:
+        await services.batches.stop()
+    await ingestion_pipeline.stop()
+    await admission.stop()
+    shutdown_executor()
+    stop_logging()
+
+setup_logging()
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://127.0.0.1:3000","https://clause-sense-legal-advisor.vercel.app"],
@@ -10,9 +42,48 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
 )
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    return JSONResponse({"detail": exc.detail}, status_code=exc.status_code,
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route template, not the raw path, so /documents/{doc_id}/status stays one series
+        route = request.scope.get("route")
+        HTTP_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method, route=getattr(route, "path", "unmatched"), status=status
+        )
+
 app.include_router(upload.router, prefix=settings.API_V1_STR, tags=["Documents"])
 app.include_router(chat.router, prefix=settings.API_V1_STR, tags=["Chat"])
 
 @app.get("/")
 def root():
     return {"message": "Legal Advisor AI is Running"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health")
+def health():
+    # Never builds the services: health probes must stay cheap during warm-up
+    if not services.chat_ready:
+        return {"status": "starting", "ingest_queue_depth": ingestion_pipeline.queue_depth, **admission.stats()}
+    return {
+        "status": "ok",
+        "turn_queue_depth": services.chat.writer.queue_depth,
+        "ingest_queue_depth": ingestion_pipeline.queue_depth,
+        "answer_cache": services.chat.answers.stats(),
+        **admission.stats(),
+    }
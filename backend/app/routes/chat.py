@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.services.chat_service import ChatService
+from app.services.container import services
+from app.services.admission import admission, AdmissionRejected
 
 router = APIRouter()
-service = ChatService()
 
 class ChatRequest(BaseModel):
     session_id: str
@@ -11,12 +12,40 @@ class ChatRequest(BaseModel):
     message: str
 
 @router.post("/chat")
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
+    # Rate limits before any DB/LLM work; AdmissionRejected -> 429 (503 once the LLM
+    # queue is full on a cache miss) + Retry-After (app.main)
+    admission.admit_chat(http_request, request.session_id)
     try:
-        return await service.process_message(
+        chat = await services.get("chat")
+        return await chat.process_message(
             session_id=request.session_id,
             doc_id=request.document_id, # Mapping document_id -> doc_id
             message=request.message
         )
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        raise HTTPException(500, str(e))
\ No newline at end of file
+        raise HTTPException(500, str(e))
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    admission.admit_chat(http_request, request.session_id)
+    chat = await services.get("chat")
+    events = chat.stream_message(
+        session_id=request.session_id,
+        doc_id=request.document_id,
+        message=request.message
+    )
+    try:
+        # Prepares the turn and waits for an LLM slot before any bytes are sent
+        await anext(events)
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        raise HTTPException(500, str(e))
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,12 +1,116 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from app.services.container import services
+from app.services.admission import admission
+from app.core.config import settings
 from app.services.document_service import DocumentService
+from app.core.metrics import span
+from app.utils.upload_intake import receive_files, UploadTooLarge
 
 router = APIRouter()
-service = DocumentService()
 
-@router.post("/upload")
-async def upload(file: UploadFile = File(...)):
+# The body is streamed by hand (receive_files) rather than declared as an
+# UploadFile, so document the multipart field for /docs explicitly
+UPLOAD_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    }
+}
+
+BATCH_UPLOAD_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+            "required": ["files"],
+        }}},
+    }
+}
+
+@router.post("/upload", openapi_extra=UPLOAD_SCHEMA)
+async def upload(request: Request):
+    admission.admit_upload(request)
+    try:
+        with span("upload.receive"):
+            files = await receive_files(request, DocumentService.MAX_FILE_SIZE,
+                                        allowed_types=DocumentService.ALLOWED_TYPES)
+    except UploadTooLarge as e:
+        raise HTTPException(413, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
     try:
-        return await service.process_upload(file)
+        documents = await services.get("documents")
+        return await documents.process_upload(files[0])
     except Exception as e:
-        raise HTTPException(500, str(e))
\ No newline at end of file
+        raise HTTPException(500, str(e))
+    finally:
+        files[0].close()
+
+@router.post("/upload/batch", status_code=202, openapi_extra=BATCH_UPLOAD_SCHEMA)
+async def upload_batch(request: Request):
+    """Accepts up to BATCH_MAX_FILES files and returns a job id; poll /upload/batch/{job_id}."""
+    admission.admit_upload(request)
+    batches = await services.get("batches")
+    batches.admit()  # shed a full queue before reading the body
+    try:
+        with span("upload.receive"):
+            # No type filter here: a wrong file fails on its own in the job results
+            files = await receive_files(request, DocumentService.MAX_FILE_SIZE, field="files",
+                                        max_files=settings.BATCH_MAX_FILES)
+    except UploadTooLarge as e:
+        raise HTTPException(413, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    try:
+        return batches.submit(files)
+    except Exception:
+        for f in files:
+            f.close()
+        raise
+
+@router.get("/upload/batch/{job_id}")
+async def upload_batch_status(job_id: str):
+    batches = await services.get("batches")
+    status = batches.status(job_id)
+    if status is None:
+        raise HTTPException(404, "Unknown batch job")
+    return status
+
+@router.get("/documents/{doc_id}/status")
+async def document_status(doc_id: str):
+    documents = await services.get("documents")
+    return {"doc_id": doc_id, **documents.ingestion.status(doc_id)}
+
+@router.get("/documents/{doc_id}/meta")
+async def document_meta(doc_id: str):
+    """Clause offsets/headings, page starts, token counts and hashes; no document text."""
+    documents = await services.get("documents")
+    meta = await documents.db_manager.get_document_meta_async(doc_id)
+    if meta is None:
+        raise HTTPException(404, "Document not found")
+    return meta
+
+@router.get("/documents/{doc_id}/clauses")
+async def document_clauses(doc_id: str, ids: str):
+    """Text of the clauses numbered in `ids` ("0,4,5", as in meta.clauses)."""
+    try:
+        clause_ids = sorted({int(i) for i in ids.split(",") if i.strip()})
+    except ValueError:
+        raise HTTPException(400, "ids must be comma-separated clause numbers")
+    documents = await services.get("documents")
+    db = documents.db_manager
+    meta = await db.get_document_meta_async(doc_id)
+    if meta is None or meta["meta"] is None:
+        raise HTTPException(404, "Document not found")
+    clauses = await db.get_document_clauses_async(doc_id, clause_ids, meta)
+    headings = meta["meta"]["clauses"]["heading"]
+    return {"doc_id": doc_id, "clauses": [
+        {"id": i, "heading": headings[i], "text": text} for i, text in sorted(clauses.items())
+    ]}
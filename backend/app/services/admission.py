@@ -0,0 +1,291 @@
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import ADMISSION_REJECTED
+
+logger = get_logger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class AdmissionRejected(Exception):
+    """Request shed before doing any work; turned into a 429/503 with Retry-After by app.main."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def parse_rate(rate: str):
+    """Parses "5/minute" into (capacity 5, refill 5/60 tokens per second)."""
+    count, _, period = rate.partition("/")
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period.strip().rstrip("s")]
+
+
+class RateLimiter:
+    """Token bucket per key (session id or client IP); idle keys are evicted LRU."""
+    MAX_KEYS = 100_000
+
+    def __init__(self, rate: str):
+        self.capacity, self.refill = parse_rate(rate)
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.refill)
+
+    def wait_time(self, key: str) -> float:
+        """Seconds until `key` has a token (0 if it has one now). Doesn't consume."""
+        tokens = self._tokens(key, time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.refill
+
+    def take(self, key: str):
+        now = time.monotonic()
+        self._buckets[key] = (self._tokens(key, now) - 1, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.MAX_KEYS:
+            self._buckets.popitem(last=False)
+
+
+class DailyQuota:
+    """
+    Requests per key per UTC day. Counting is in memory; pending increments are
+    added to a local SQLite table at most every QUOTA_FLUSH_SECONDS (one
+    transaction per flush), and the flush reads back the totals so workers on
+    the same host converge on a shared count. path="" keeps it in memory only.
+    The database is opened on first use, not when the module is imported.
+    """
+
+    def __init__(self, limit: int, path: str = "", flush_interval: float = None):
+        self.limit = limit
+        self.flush_interval = flush_interval if flush_interval is not None else settings.QUOTA_FLUSH_SECONDS
+        self._day = None
+        self._base = {}     # key -> total as of the last flush/load
+        self._pending = {}  # key -> increments not yet written
+        self._last_flush = time.monotonic()
+        self._flushing = False
+        self._lock = threading.Lock()          # the sqlite connection
+        self._pending_lock = threading.Lock()  # swapping _pending out for a flush
+        self.path = path
+        self._conn = None
+
+    def _open(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS quota ("
+            "day TEXT NOT NULL, key TEXT NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (day, key))"
+        )
+        return conn
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    @staticmethod
+    def seconds_until_reset() -> float:
+        now = datetime.now(timezone.utc)
+        midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (midnight - now).total_seconds()
+
+    def _roll(self):
+        today = self._today()
+        if today == self._day:
+            return
+        self._day, self._base, self._pending = today, {}, {}
+        if self.path and self._conn is None:
+            # First use; flushes are only scheduled after a take(), so they never race this
+            self._conn = self._open()
+        if self._conn is not None:
+            with self._lock:
+                rows = self._conn.execute("SELECT key, count FROM quota WHERE day = ?", (today,)).fetchall()
+                cutoff = (datetime.now(timezone.utc) - timedelta(days=7)).strftime("%Y-%m-%d")
+                self._conn.execute("DELETE FROM quota WHERE day < ?", (cutoff,))
+            self._base = dict(rows)
+
+    def used(self, key: str) -> int:
+        self._roll()
+        return self._base.get(key, 0) + self._pending.get(key, 0)
+
+    def remaining(self, key: str) -> int:
+        return max(0, self.limit - self.used(key))
+
+    def take(self, key: str):
+        self._roll()
+        with self._pending_lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+
+    @property
+    def flush_due(self) -> bool:
+        return (self._conn is not None and bool(self._pending) and not self._flushing
+                and time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def flush(self):
+        """Blocking; run it in a thread."""
+        if self._conn is None or not self._pending:
+            return
+        self._flushing = True
+        try:
+            with self._pending_lock:
+                day, pending, self._pending = self._day, self._pending, {}
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(
+                        "INSERT INTO quota (day, key, count) VALUES (?, ?, ?) "
+                        "ON CONFLICT (day, key) DO UPDATE SET count = count + excluded.count",
+                        [(day, k, n) for k, n in pending.items()]
+                    )
+                    marks = ",".join("?" * len(pending))
+                    totals = self._conn.execute(
+                        f"SELECT key, count FROM quota WHERE day = ? AND key IN ({marks})", (day, *pending)
+                    ).fetchall()
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    # Keep the increments for the next flush
+                    with self._pending_lock:
+                        for k, n in pending.items():
+                            self._pending[k] = self._pending.get(k, 0) + n
+                    raise
+            if day == self._day:
+                self._base.update(totals)
+        finally:
+            self._last_flush = time.monotonic()
+            self._flushing = False
+
+
+class LLMQueue:
+    """
+    At most `max_concurrency` completions in flight per worker, at most
+    `max_waiting` requests queued behind them, and no one waits longer than
+    `wait_timeout`. Anything beyond that is shed with a 503 instead of
+    piling onto the provider and timing out there.
+    """
+
+    def __init__(self, max_concurrency: int, max_waiting: int, wait_timeout: float):
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+
+    @property
+    def full(self) -> bool:
+        return self.waiting >= self.max_waiting
+
+    def retry_after(self) -> float:
+        return max(1.0, self.wait_timeout / 2)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.full:
+            ADMISSION_REJECTED.inc(reason="llm_queue_full")
+            raise AdmissionRejected(503, "Server busy, please retry shortly.", self.retry_after())
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.wait_timeout)
+        except asyncio.TimeoutError:
+            ADMISSION_REJECTED.inc(reason="llm_queue_timeout")
+            raise AdmissionRejected(503, "Server busy, please retry shortly.", self.retry_after())
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+
+class AdmissionController:
+    """
+    Runs before /chat and /upload do any work. Checks, cheapest first:
+    per-session and per-IP token buckets (429), then the per-IP daily chat
+    quota (429 until UTC midnight). LLM queue saturation (503) is checked by
+    `llm.slot()` on an answer cache miss, since cached answers need no slot.
+    """
+
+    def __init__(self):
+        self.enabled = settings.RATE_LIMIT_ENABLED
+        self.sessions = RateLimiter(settings.RATE_LIMIT)
+        self.ips = RateLimiter(settings.IP_RATE_LIMIT)
+        self.uploads = RateLimiter(settings.UPLOAD_RATE_LIMIT)
+        self.quota = DailyQuota(settings.DAILY_QUOTA, settings.QUOTA_PATH)
+        self.llm = LLMQueue(settings.LLM_MAX_CONCURRENCY, settings.LLM_QUEUE_SIZE, settings.LLM_QUEUE_TIMEOUT_SECONDS)
+
+    @staticmethod
+    def client_ip(request) -> str:
+        """
+        The socket peer, or with TRUSTED_PROXY_HOPS = n the address the n-th
+        proxy from us appended to X-Forwarded-For. Entries left of that are
+        whatever the client sent, so they're never used.
+        """
+        hops = settings.TRUSTED_PROXY_HOPS
+        if hops > 0:
+            forwarded = [a.strip() for a in request.headers.get("x-forwarded-for", "").split(",") if a.strip()]
+            if len(forwarded) >= hops:
+                return forwarded[-hops]
+        return request.client.host if request.client else "unknown"
+
+    def _reject(self, reason: str, status_code: int, detail: str, retry_after: float, key: str):
+        ADMISSION_REJECTED.inc(reason=reason)
+        logger.info("Request rejected", extra={"reason": reason, "client": key, "retry_after": retry_after})
+        raise AdmissionRejected(status_code, detail, retry_after)
+
+    def admit_chat(self, request, session_id: str):
+        if not self.enabled:
+            return
+        ip = self.client_ip(request)
+        session_wait, ip_wait = self.sessions.wait_time(session_id), self.ips.wait_time(ip)
+        if ip_wait > session_wait:
+            self._reject("rate_limit", 429, f"Rate limit exceeded ({settings.IP_RATE_LIMIT} per client).", ip_wait, ip)
+        if session_wait > 0:
+            self._reject("rate_limit", 429, f"Rate limit exceeded ({settings.RATE_LIMIT} per session).", session_wait, ip)
+        if self.quota.remaining(ip) <= 0:
+            self._reject("daily_quota", 429, f"Daily limit of {self.quota.limit} messages reached.",
+                         self.quota.seconds_until_reset(), ip)
+        self.sessions.take(session_id)
+        self.ips.take(ip)
+        self.quota.take(ip)
+        if self.quota.flush_due:
+            self.quota._flushing = True  # claimed here so only one flush is scheduled
+            asyncio.get_running_loop().run_in_executor(None, self._flush)
+
+    def admit_upload(self, request):
+        if not self.enabled:
+            return
+        ip = self.client_ip(request)
+        wait = max(self.uploads.wait_time(ip), self.ips.wait_time(ip))
+        if wait > 0:
+            self._reject("upload_rate_limit", 429, f"Upload limit exceeded ({settings.UPLOAD_RATE_LIMIT}).", wait, ip)
+        self.uploads.take(ip)
+        self.ips.take(ip)
+
+    def _flush(self):
+        try:
+            self.quota.flush()
+        except Exception as e:
+            logger.warning("Quota flush failed", extra={"error": str(e)})
+
+    async def stop(self):
+        await asyncio.to_thread(self._flush)
+
+    def stats(self) -> dict:
+        return {"llm_in_flight": self.llm.in_flight, "llm_waiting": self.llm.waiting}
+
+
+admission = AdmissionController()
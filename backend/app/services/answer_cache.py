@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+KEEP_SYMBOLS = frozenset("%$₹")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Cache-key form of a question: NFKC, casefolded, whitespace collapsed;
+    letters (with their combining marks, e.g. Devanagari vowel signs), digits
+    and % $ ₹ kept, other punctuation dropped. Unlike the router's
+    normalize_query it never maps distinct non-ASCII questions to one string.
+    """
+    text = unicodedata.normalize("NFKC", question or "").casefold()
+    kept = "".join(
+        ch if unicodedata.category(ch)[0] in "LMN" or ch in KEEP_SYMBOLS else " "
+        for ch in text
+    )
+    return " ".join(kept.split())
+
+
+class MemoryBackend:
+    """Per-process LRU with expiry times."""
+    blocking = False
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SqliteBackend:
+    """Local disk store shared by every worker on the host; survives restarts."""
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_used_at ON answers (used_at)")
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE answers SET used_at = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key: str, value: str, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now)
+            )
+            self._conn.execute("DELETE FROM answers WHERE expires_at < ?", (now,))
+            # Least recently used beyond the cap
+            self._conn.execute(
+                "DELETE FROM answers WHERE key IN ("
+                "SELECT key FROM answers ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+
+
+class AnswerCache:
+    """
+    Final answers keyed on (sorted document ids, normalized question, digest of
+    the last few history messages). A hit skips prompt assembly and the LLM.
+    Document ids are safe as a content key: a stored document never changes.
+    """
+
+    def __init__(self, backend=None, ttl: float = None, history_messages: int = None):
+        self.backend = backend if backend is not None else _make_backend()
+        self.ttl = ttl or settings.ANSWER_CACHE_TTL_SECONDS
+        self.history_messages = history_messages if history_messages is not None else settings.ANSWER_CACHE_HISTORY_MESSAGES
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, doc_ids: list, question: str, history: list):
+        """None when the question has nothing left to key on (never cached)."""
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        tail = history[-self.history_messages:] if self.history_messages else []
+        payload = json.dumps([
+            sorted(set(doc_ids)),
+            normalized,
+            [(m["role"], m["content"]) for m in tail],
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def _call(self, fn, *args):
+        # Disk backends go through the thread pool; the memory backend doesn't need the hop
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def get(self, key: str):
+        if self.backend is False or key is None:
+            return None
+        try:
+            raw = await self._call(self.backend.get, key)
+        except Exception as e:
+            logger.warning("Answer cache read failed", extra={"error": str(e)})
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def put(self, key: str, answer: dict):
+        if self.backend is False or key is None:
+            return
+        try:
+            await self._call(self.backend.put, key, json.dumps(answer), self.ttl)
+        except Exception as e:
+            logger.warning("Answer cache write failed", extra={"error": str(e)})
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend else "off",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def _make_backend():
+    kind = settings.ANSWER_CACHE_BACKEND
+    if kind == "memory":
+        return MemoryBackend(settings.ANSWER_CACHE_MAX_ENTRIES)
+    if kind == "sqlite":
+        return SqliteBackend(settings.ANSWER_CACHE_PATH, settings.ANSWER_CACHE_MAX_ENTRIES)
+    if kind == "off":
+        return False
+    raise ValueError(f"Unknown ANSWER_CACHE_BACKEND: {kind}")
@@ -0,0 +1,137 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import span, ADMISSION_REJECTED
+from app.services.admission import AdmissionRejected
+
+logger = get_logger(__name__)
+
+
+class BatchUploads:
+    """
+    Multi-file uploads as background jobs. The route only streams the files in
+    and answers with a job id; BATCH_WORKERS tasks then run every file through
+    DocumentService.process_upload (same validation, dedup, extraction and
+    storage as a single /upload). PDF pages fan out over the PDF_WORKERS
+    process pool, so a batch is bounded by cores rather than client round-trips.
+
+    Job state is kept in this process (the API runs one uvicorn worker); the
+    newest MAX_TRACKED jobs stay queryable.
+    """
+    MAX_TRACKED = 1000
+
+    def __init__(self, documents, workers: int = None, max_queued: int = None):
+        self.documents = documents
+        self.workers = workers or settings.BATCH_WORKERS
+        self.max_queued = max_queued or settings.BATCH_QUEUE_FILES
+        self._queue = None
+        self._tasks = []
+        self._jobs = OrderedDict()  # job_id -> {"job_id", "state", "files", ...}
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def admit(self, files: int = 1):
+        """Raises a 503 AdmissionRejected if `files` more would overflow BATCH_QUEUE_FILES."""
+        if self.queue_depth + files > self.max_queued:
+            ADMISSION_REJECTED.inc(reason="batch_queue_full")
+            raise AdmissionRejected(503, "Upload queue is full, please retry shortly.", 30)
+
+    def start(self):
+        self._queue = self._queue or asyncio.Queue()
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._run()))
+
+    def submit(self, files: list) -> dict:
+        """Queues ReceivedFiles as one job and returns its status. The workers close the files."""
+        self.start()
+        self.admit(len(files))
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "state": "queued",
+            "created_at": time.time(),
+            "finished_at": None,
+            "pending": len(files),
+            "files": [{"filename": f.filename, "size": f.size, "state": "queued"} for f in files],
+        }
+        self._jobs[job_id] = job
+        while len(self._jobs) > self.MAX_TRACKED:
+            self._jobs.popitem(last=False)
+        for i, f in enumerate(files):
+            self._queue.put_nowait((job, i, f))
+        logger.info("Batch upload queued", extra={"job_id": job_id, "files": len(files)})
+        return self.status(job_id)
+
+    def status(self, job_id: str):
+        """
+        Job state (queued / processing / completed) with per-file results:
+        stored or duplicate (with doc_id and its ingestion state), failed
+        (with error), or still queued/processing. None for unknown ids.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        files, counts = [], {}
+        for entry in job["files"]:
+            counts[entry["state"]] = counts.get(entry["state"], 0) + 1
+            if entry.get("doc_id"):
+                entry = {**entry, "ingestion": self.documents.ingestion.status(entry["doc_id"])["state"]}
+            files.append(entry)
+        return {
+            "job_id": job_id,
+            "state": job["state"],
+            "total": len(files),
+            "processed": len(files) - job["pending"],
+            "counts": counts,
+            "created_at": job["created_at"],
+            "finished_at": job["finished_at"],
+            "files": files,
+        }
+
+    async def stop(self):
+        """Finish every queued file, then stop the workers."""
+        if not self._tasks:
+            return
+        for _ in self._tasks:
+            self._queue.put_nowait(None)
+        await asyncio.gather(*self._tasks)
+        self._tasks = []
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            await self._process(*item)
+
+    async def _process(self, job: dict, index: int, file):
+        entry = job["files"][index]
+        entry["state"] = "processing"
+        if job["state"] == "queued":
+            job["state"] = "processing"
+        try:
+            with span("batch.file"):
+                result = await self.documents.process_upload(file)
+            if result.get("status") == "success":
+                entry.update(state="duplicate" if result.get("duplicate") else "stored", doc_id=result["doc_id"])
+            else:
+                entry.update(state="failed", error=result.get("message"))
+        except Exception as e:
+            # process_upload raises ValueError for a bad type/size; anything else is ours
+            entry.update(state="failed", error=str(e))
+        finally:
+            file.close()
+            job["pending"] -= 1
+            if not job["pending"]:
+                job.update(state="completed", finished_at=time.time())
+                failed = sum(1 for f in job["files"] if f["state"] == "failed")
+                logger.info("Batch upload completed", extra={
+                    "job_id": job["job_id"], "files": len(job["files"]), "failed": failed,
+                    "seconds": round(job["finished_at"] - job["created_at"], 3),
+                })
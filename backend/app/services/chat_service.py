@@ -1,91 +1,191 @@
+import asyncio
+import json
+from contextlib import AsyncExitStack
 from app.services.session_manager import SessionManager
-from groq import Groq
-from app.core.config import settings
+from app.services.ingestion import ingestion_pipeline
+from app.services.prompt_assembler import PromptAssembler
+from app.services.clause_diff import ClauseAligner
+from app.services.answer_cache import AnswerCache
+from app.services.turn_writer import TurnWriter
+from app.services.session_memory import SessionMemory
+from app.services.admission import admission, AdmissionRejected
+from app.services.provider_gateway import get_gateway, GROQ, GROQ_FALLBACK
+from app.core.logger import get_logger
+from app.core.metrics import span, timed, PROMPT_TOKENS, PROMPT_CHARS
+
+logger = get_logger(__name__)
+
+CHAT_PROVIDERS = [GROQ, GROQ_FALLBACK]
+
+SYSTEM_PROMPT = (
+    "You are an expert Legal Advisor AI. "
+    "I have provided one or more documents below. "
+    "Answer the user's question based strictly on these documents. "
+    "If comparing documents, explicitly cite differences in clauses or terms between them."
+    "\n\nDISCLAIMER: I am an AI, not a lawyer."
+)
 
 class ChatService:
     def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        # Groq primary -> Groq fallback model, with deadlines, breakers and hedging
+        self.gateway = get_gateway()
         self.mgr = SessionManager()
+        self.ingestion = ingestion_pipeline
+        # Caps outstanding completions per worker; a bounded number of requests
+        # wait for a slot, the rest are shed with a 503 (see admission.py)
+        self.llm_queue = admission.llm
+        # Same clause index store the ingestion stage writes to (freshly built indexes stay in memory)
+        # Comparison questions get aligned clause diffs (cached per document pair)
+        self.assembler = PromptAssembler(
+            self.ingestion.clause_index, aligner=ClauseAligner(self.ingestion.clause_index)
+        )
+        # Rolling summary + short verbatim tail on the sessions row, updated after each save
+        self.memory = SessionMemory(self.mgr, self.gateway)
+        # Turns are persisted in the background; responses don't wait on Supabase
+        self.writer = TurnWriter(self.mgr, on_saved=self.memory.schedule)
+        self.answers = AnswerCache()
 
-    async def process_message(self, session_id: str, doc_id: str, message: str):
-        # 1. Get Chat History
-        history = self.mgr.get_history(session_id)
-        history_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in history])
-
-        # 2. MULTI-DOCUMENT FETCHING LOGIC
-        context_parts = []
-        
+    async def _prepare_turn(self, session_id: str, doc_id: str, message: str) -> dict:
+        """
+        Loads history + documents, then either finds a cached answer or builds the
+        prompt. Returns a dict with cache_key, doc_status and either `cached`
+        or messages / context_parts / usage.
+        """
         # Split the comma-separated string into a list of IDs
+        doc_ids_list = []
         if doc_id and doc_id not in ["general", "general_chat", ""]:
-            doc_ids_list = [d.strip() for d in doc_id.split(',')]
-            print(f"📖 Processing {len(doc_ids_list)} documents: {doc_ids_list}")
-
-            for d_id in doc_ids_list:
-                if not d_id: continue
-                
-                # Fetch individual document content
-                doc_data = self.mgr.get_document_data(d_id)
-                
-                if doc_data:
-                    text = doc_data.get('content', '')
-                    filename = doc_data.get('filename', 'Unknown File')
-                    
-                    # Truncate text to fit context window (approx 15k chars per doc if comparing 2)
-                    limit = 30000 // max(1, len(doc_ids_list))
-                    if len(text) > limit:
-                        text = text[:limit] + "...[truncated]"
-                        
-                    context_parts.append(f"\n--- START DOCUMENT: {filename} ---\n{text}\n--- END DOCUMENT ---\n")
-                else:
-                    print(f"⚠️ Warning: Could not find doc {d_id} in DB")
-
-        full_context = "\n".join(context_parts)
-        
-        if not full_context:
-            full_context = "No documents found in context. Answer based on general legal knowledge."
-
-        # 3. Build System Prompt
-        system_prompt = (
-            "You are an expert Legal Advisor AI. "
-            "I have provided one or more documents below. "
-            "Answer the user's question based strictly on these documents. "
-            "If comparing documents, explicitly cite differences in clauses or terms between them."
-            "\n\nDISCLAIMER: I am an AI, not a lawyer."
+            doc_ids_list = [d.strip() for d in doc_id.split(',') if d.strip()]
+            logger.info("Processing documents", extra={"doc_ids": doc_ids_list})
+
+        # 1. Get conversation memory (one sessions-row read) + all documents concurrently
+        #    Documents come from the in-process cache, or one batched query for the misses
+        (summary, history), docs_by_id = await asyncio.gather(
+            timed("chat.get_history", self.memory.load(session_id)),
+            timed("chat.get_documents", self.mgr.get_documents_data_async(doc_ids_list))
         )
-        
-        user_prompt = f"""
-        CHAT HISTORY:
-        {history_text}
-
-        ACTIVE DOCUMENTS:
-        {full_context}
-        
-        QUESTION: 
-        {message}
+
+        # 2. MULTI-DOCUMENT CONTEXT
+        documents, doc_status = [], {}
+        for d_id in doc_ids_list:
+            doc_data = docs_by_id.get(d_id)
+            if doc_data:
+                text = doc_data.get('content', '') or ''
+                documents.append((d_id, doc_data.get('filename', 'Unknown File'), text))
+                doc_status[d_id] = self.ingestion.status(d_id)["state"]
+                if doc_status[d_id] == "unknown":
+                    # Uploaded before background ingestion existed: backfill it now
+                    self.ingestion.submit(d_id, text)
+                    doc_status[d_id] = "queued"
+            else:
+                logger.warning("Document not found", extra={"doc_id": d_id})
+
+        # 3. Same documents + same question + same recent history -> reuse the answer
+        turn = {"cache_key": self.answers.key(list(doc_status), message, history), "doc_status": doc_status}
+        with span("chat.answer_cache"):
+            turn["cached"] = await self.answers.get(turn["cache_key"])
+        if turn["cached"]:
+            logger.info("Answer cache hit", extra={"session_id": session_id})
+            return turn
+
+        # 4. Fit system prompt, history and documents into the token budget
+        #    (long documents are cut down to their most relevant clauses)
+        with span("chat.assemble_prompt"):
+            turn["messages"], turn["context_parts"], turn["usage"] = await asyncio.to_thread(
+                self.assembler.assemble, SYSTEM_PROMPT, history, documents, message, summary
+            )
+        usage = turn["usage"]
+        PROMPT_TOKENS.observe(usage["total"], kind="chat")
+        PROMPT_CHARS.observe(sum(len(m["content"]) for m in turn["messages"]), kind="chat")
+        logger.info("Prompt assembled", extra={
+            "prompt_tokens": usage["total"], "budget": usage["budget"],
+            "history_tokens": usage["history"], "document_tokens": sum(usage["documents"].values())
+        })
+        return turn
+
+    @staticmethod
+    def _primary_doc(doc_id: str) -> str:
+        # Save the turn (Link to the first document for simplicity)
+        return doc_id.split(',')[0].strip() if doc_id else "general"
+
+    async def _finish_turn(self, session_id: str, doc_id: str, message: str, turn: dict, response_text: str) -> dict:
+        """Persists the turn, caches a fresh answer and returns the response metadata."""
+        self.writer.enqueue(session_id, self._primary_doc(doc_id), message, response_text)
+        if turn["cached"]:
+            return {**{k: v for k, v in turn["cached"].items() if k != "response"},
+                    "cached": True, "document_status": turn["doc_status"]}
+        meta = {
+            "router_decision": "Clause Comparison" if "comparison" in turn["usage"] else "Multi-Doc Analysis",
+            "sources": [f"{len(turn['doc_status'])} Documents"],
+        }
+        await self.answers.put(turn["cache_key"], {"response": response_text, **meta})
+        return {**meta, "prompt_tokens": turn["usage"], "document_status": turn["doc_status"]}
+
+    async def process_message(self, session_id: str, doc_id: str, message: str):
+        turn = await self._prepare_turn(session_id, doc_id, message)
+
+        try:
+            # 5. Generate Answer (skipped entirely on a cache hit)
+            if turn["cached"]:
+                response_text = turn["cached"]["response"]
+            else:
+                async with self.llm_queue.slot():
+                    with span("chat.llm_completion"):
+                        response_text = await self.gateway.complete(turn["messages"], order=CHAT_PROVIDERS, temperature=0.1)
+
+            meta = await self._finish_turn(session_id, doc_id, message, turn, response_text)
+            return {"response": response_text, **meta}
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.exception("Chat failed", extra={"session_id": session_id})
+            return {"response": f"System Error: {str(e)}", "sources": []}
+
+    @staticmethod
+    def _sse(data: dict, event: str = None) -> str:
+        frame = f"event: {event}\n" if event else ""
+        return frame + f"data: {json.dumps(data)}\n\n"
+
+    async def stream_message(self, session_id: str, doc_id: str, message: str):
+        """
+        Same pipeline as process_message, but yields Server-Sent Events:
+        one `token` frame per provider delta, then a `done` frame with metadata.
+        The assembled answer is saved on completion; an answer cut short by an
+        error or a client disconnect is saved marked as interrupted, which keeps
+        it out of session memory and history.
+
+        The first item is None, yielded once the turn is prepared and an LLM
+        slot is held. The route awaits it before starting the response, so a
+        full queue is a 503 (AdmissionRejected) instead of an error event.
         """
+        turn = await self._prepare_turn(session_id, doc_id, message)
+        slot = AsyncExitStack()
+        if not turn["cached"]:
+            await slot.enter_async_context(self.llm_queue.slot())
+        pieces = []
 
         try:
-            # 4. Generate Answer
-            completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.1
-            )
-            
-            response_text = completion.choices[0].message.content
-            
-            # Save the turn (Link to the first document for simplicity)
-            primary_doc = doc_id.split(',')[0].strip() if doc_id else "general"
-            self.mgr.save_turn(session_id, primary_doc, message, response_text)
-
-            return {
-                "response": response_text,
-                "router_decision": "Multi-Doc Analysis",
-                "sources": [f"{len(context_parts)} Documents"]
-            }
+            yield None
+            if turn["cached"]:
+                pieces.append(turn["cached"]["response"])
+                yield self._sse({"token": pieces[0]}, event="token")
+            else:
+                with span("chat.llm_stream"):
+                    async for token in self.gateway.stream(turn["messages"], order=CHAT_PROVIDERS, temperature=0.1):
+                        pieces.append(token)
+                        yield self._sse({"token": token}, event="token")
+                await slot.aclose()
+
+            # _finish_turn enqueues the save before its first await, so hand it over now
+            answer, pieces = "".join(pieces), []
+            meta = await self._finish_turn(session_id, doc_id, message, turn, answer)
+            yield self._sse(meta, event="done")
         except Exception as e:
-            print(f"Chat Error: {e}")
-            return {"response": f"System Error: {str(e)}", "sources": []}
\ No newline at end of file
+            logger.exception("Chat stream failed", extra={"session_id": session_id})
+            yield self._sse({"error": f"System Error: {str(e)}", "sources": []}, event="error")
+        finally:
+            # Still holding pieces means the answer never completed (error or client
+            # disconnect); enqueueing is synchronous so it's safe even mid-cancel.
+            if pieces:
+                self.writer.enqueue(session_id, self._primary_doc(doc_id), message, "".join(pieces), interrupted=True)
+            # Releasing the slot never suspends either (no-op if already released)
+            await slot.aclose()
@@ -0,0 +1,152 @@
+import re
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from app.core.config import settings
+from app.services.clause_index import tokenize
+
+# "compare", "difference(s)", "differ", "versus"/"vs", "contrast", "which one ... better"
+COMPARE_RE = re.compile(
+    r"\b(compar\w*|differ\w*|versus|vs\.?|contrast\w*|deviat\w*|mismatch\w*|"
+    r"same as|which (?:one|document|contract|agreement))\b",
+    re.IGNORECASE,
+)
+# Numbering/labels in front of a heading: "12.3", "Clause 7:", "(b)", "ARTICLE IV -"
+HEADING_PREFIX_RE = re.compile(
+    r"^\s*(?:(?:section|article|clause|schedule|annexure|annex|exhibit|appendix)\s+[\w.\-]+"
+    r"|\d{1,3}(?:\.\d{1,3})*|[ivxlc]{1,6}[.)]|\([a-z0-9]{1,4}\))?[.):\-\s]*",
+    re.IGNORECASE,
+)
+CANDIDATES = 3  # Most-similar clauses (by term overlap) that get a full SequenceMatcher pass
+DIFF_CONTEXT_WORDS = 6
+
+
+def is_comparison(question: str, doc_count: int) -> bool:
+    return doc_count >= 2 and bool(COMPARE_RE.search(question or ""))
+
+
+def heading_key(heading: str) -> str:
+    return " ".join(tokenize(HEADING_PREFIX_RE.sub("", heading or "", count=1)))
+
+
+def word_diff(a: str, b: str) -> str:
+    """Word-level changes as `[-old-]{+new+}` with a few words of context, gaps shown as `…`."""
+    wa, wb = a.split(), b.split()
+    out = []
+    opcodes = SequenceMatcher(None, wa, wb, autojunk=False).get_opcodes()
+    for n, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if tag == "equal":
+            if i2 - i1 <= 2 * DIFF_CONTEXT_WORDS:
+                out.append(" ".join(wa[i1:i2]))
+            else:
+                # Context after the previous change and before the next one
+                head = " ".join(wa[i1:i1 + DIFF_CONTEXT_WORDS]) if n > 0 else ""
+                tail = " ".join(wa[i2 - DIFF_CONTEXT_WORDS:i2]) if n < len(opcodes) - 1 else ""
+                out.append(" ".join(p for p in (head, "…", tail) if p))
+            continue
+        if i2 > i1:
+            out.append("[-" + " ".join(wa[i1:i2]) + "-]")
+        if j2 > j1:
+            out.append("{+" + " ".join(wb[j1:j2]) + "+}")
+    return " ".join(out)
+
+
+def align(index_a, text_a: str, index_b, text_b: str, min_similarity: float = None) -> list:
+    """
+    Pairs the clauses of two documents: first by identical headings (numbering
+    ignored), then greedily by text similarity among the remaining clauses.
+    Returns entries {"a", "b", "heading", "similarity", "status", "diff"} in
+    document A order, with B-only clauses after; status is one of
+    same / changed / only_a / only_b. Offsets only: no clause text is stored.
+    """
+    min_similarity = settings.COMPARE_MIN_SIMILARITY if min_similarity is None else min_similarity
+    clauses_a, clauses_b = index_a.clauses, index_b.clauses
+    body_a = [text_a[c["start"]:c["end"]] for c in clauses_a]
+    body_b = [text_b[c["start"]:c["end"]] for c in clauses_b]
+    pairs = {}  # index in A -> (index in B, similarity)
+
+    # 1. Same heading on both sides (only when the heading is unique in each document)
+    keys_a, keys_b = {}, {}
+    for i, c in enumerate(clauses_a):
+        keys_a.setdefault(heading_key(c["heading"]), []).append(i)
+    for j, c in enumerate(clauses_b):
+        keys_b.setdefault(heading_key(c["heading"]), []).append(j)
+    for key, ia in keys_a.items():
+        jb = keys_b.get(key)
+        if key and len(ia) == 1 and jb and len(jb) == 1:
+            i, j = ia[0], jb[0]
+            pairs[i] = (j, SequenceMatcher(None, body_a[i].split(), body_b[j].split(), autojunk=False).ratio())
+
+    # 2. The rest by similarity: term-overlap shortlist, then SequenceMatcher on words
+    taken_b = {j for j, _ in pairs.values()}
+    terms_a = [set(tokenize(t)) for t in body_a]
+    terms_b = [set(tokenize(t)) for t in body_b]
+    scored = []
+    for i in range(len(clauses_a)):
+        if i in pairs or not terms_a[i]:
+            continue
+        overlap = sorted(
+            ((len(terms_a[i] & terms_b[j]) / len(terms_a[i] | terms_b[j]), j)
+             for j in range(len(clauses_b)) if j not in taken_b and terms_b[j]),
+            reverse=True,
+        )[:CANDIDATES]
+        for jaccard, j in overlap:
+            if jaccard <= 0:
+                continue
+            matcher = SequenceMatcher(None, body_a[i].split(), body_b[j].split(), autojunk=False)
+            if matcher.quick_ratio() >= min_similarity:
+                scored.append((matcher.ratio(), i, j))
+    for ratio, i, j in sorted(scored, reverse=True):
+        if ratio >= min_similarity and i not in pairs and j not in taken_b:
+            pairs[i] = (j, ratio)
+            taken_b.add(j)
+
+    # 3. Entries, with diffs for the changed pairs
+    entries = []
+    for i, c in enumerate(clauses_a):
+        if i in pairs:
+            j, ratio = pairs[i]
+            same = " ".join(body_a[i].split()) == " ".join(body_b[j].split())
+            entries.append({
+                "a": i, "b": j, "heading": c["heading"] or clauses_b[j]["heading"],
+                "similarity": round(ratio, 3), "status": "same" if same else "changed",
+                "diff": "" if same else word_diff(body_a[i], body_b[j]),
+            })
+        else:
+            entries.append({"a": i, "b": None, "heading": c["heading"], "similarity": 0.0,
+                            "status": "only_a", "diff": ""})
+    for j, c in enumerate(clauses_b):
+        if j not in taken_b:
+            entries.append({"a": None, "b": j, "heading": c["heading"], "similarity": 0.0,
+                            "status": "only_b", "diff": ""})
+    return entries
+
+
+class ClauseAligner:
+    """
+    Alignments per document pair, computed once and kept in an LRU so follow-up
+    questions about the same documents skip the diffing. Keyed on ids and
+    content lengths, like the clause indexes they are built from.
+    """
+    MAX_PAIRS = 64
+
+    def __init__(self, clause_index):
+        self.clause_index = clause_index
+        self._pairs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, doc_a: tuple, doc_b: tuple) -> list:
+        """`doc_a`/`doc_b` are (doc_id, text). CPU-bound on a miss: call off the event loop."""
+        (id_a, text_a), (id_b, text_b) = doc_a, doc_b
+        key = (id_a, len(text_a), id_b, len(text_b))
+        with self._lock:
+            entries = self._pairs.get(key)
+            if entries is not None:
+                self._pairs.move_to_end(key)
+                return entries
+        entries = align(self.clause_index.get(id_a, text_a), text_a, self.clause_index.get(id_b, text_b), text_b)
+        with self._lock:
+            self._pairs[key] = entries
+            while len(self._pairs) > self.MAX_PAIRS:
+                self._pairs.popitem(last=False)
+        return entries
@@ -0,0 +1,192 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from app.core.config import settings
+from app.utils.clause_splitter import split_clauses
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be been by for from has have if in into is it its of on or "
+    "shall such that the their then there these this those to was were which will with "
+    "what who whom how when where why does do any all may can".split()
+)
+
+
+def tokenize(text: str):
+    tokens = []
+    for tok in TOKEN_RE.findall(text.lower()):
+        if tok in STOPWORDS or len(tok) < 2:
+            continue
+        # Cheap plural folding: "penalties" ~ "penalty", "terms" ~ "term"
+        if len(tok) > 4 and tok.endswith("ies"):
+            tok = tok[:-3] + "y"
+        elif len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+class ClauseIndex:
+    """
+    BM25 index over the clauses of a single document.
+    Only offsets are kept; clause text is sliced out of the document content on demand.
+    """
+    VERSION = 1
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, doc_id: str, content_len: int, clauses: list, lengths: list, postings: dict):
+        self.doc_id = doc_id
+        self.content_len = content_len
+        self.clauses = clauses
+        self.lengths = lengths
+        self.postings = postings
+        self.avgdl = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @classmethod
+    def build(cls, doc_id: str, text: str):
+        clauses = split_clauses(text)
+        lengths, postings = [], {}
+        for i, c in enumerate(clauses):
+            # Headings are repeated in the body text on purpose: they are the best signal we have
+            terms = tokenize(c["heading"] + " " + text[c["start"]:c["end"]])
+            lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                postings.setdefault(term, []).append([i, tf])
+        return cls(doc_id, len(text), clauses, lengths, postings)
+
+    def search(self, query: str, top_k: int = None):
+        """Returns [(clause_idx, score)] sorted by score, best first."""
+        n = len(self.clauses)
+        if not n:
+            return []
+        scores = {}
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for i, tf in plist:
+                norm = self.K1 * (1 - self.B + self.B * self.lengths[i] / (self.avgdl or 1))
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        return ranked[:top_k] if top_k else ranked
+
+    def to_dict(self):
+        return {
+            "version": self.VERSION,
+            "doc_id": self.doc_id,
+            "content_len": self.content_len,
+            "clauses": self.clauses,
+            "lengths": self.lengths,
+            "postings": self.postings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["doc_id"], data["content_len"], data["clauses"], data["lengths"], data["postings"])
+
+
+class ClauseIndexStore:
+    """
+    Persists one JSON index per document under CLAUSE_INDEX_DIR and keeps the
+    most recently used ones in memory. A missing or stale file is rebuilt from
+    the document text, so older uploads (and fresh disks on redeploy) still work.
+    """
+    MAX_LOADED = 128
+
+    def __init__(self, root: str = None):
+        self.root = root or settings.CLAUSE_INDEX_DIR
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, doc_id: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_\-]", "_", doc_id)
+        return os.path.join(self.root, f"{safe}.json")
+
+    def _remember(self, index: ClauseIndex):
+        with self._lock:
+            self._loaded[index.doc_id] = index
+            self._loaded.move_to_end(index.doc_id)
+            while len(self._loaded) > self.MAX_LOADED:
+                self._loaded.popitem(last=False)
+
+    def build(self, doc_id: str, text: str) -> ClauseIndex:
+        index = ClauseIndex.build(doc_id, text)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp = self._path(doc_id) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index.to_dict(), f, separators=(",", ":"))
+            os.replace(tmp, self._path(doc_id))
+        except OSError as e:
+            logger.warning("Clause index save failed", extra={"doc_id": doc_id, "error": str(e)})
+        self._remember(index)
+        return index
+
+    def has(self, doc_id: str) -> bool:
+        with self._lock:
+            if doc_id in self._loaded:
+                return True
+        return os.path.exists(self._path(doc_id))
+
+    def _load(self, doc_id: str):
+        try:
+            with open(self._path(doc_id), encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == ClauseIndex.VERSION:
+                return ClauseIndex.from_dict(data)
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def get(self, doc_id: str, text: str) -> ClauseIndex:
+        with self._lock:
+            index = self._loaded.get(doc_id)
+            if index:
+                self._loaded.move_to_end(doc_id)
+        if index is None:
+            index = self._load(doc_id)
+            if index:
+                self._remember(index)
+        if index is None or index.content_len != len(text):
+            index = self.build(doc_id, text)
+        return index
+
+
+def select_clauses(index: ClauseIndex, text: str, query: str, char_budget: int):
+    """
+    Packs the best clauses for `query` into `char_budget` characters.
+    Top-scoring clauses go first; leftover room is filled in document order so
+    short documents still go in whole and vague questions ("summarise this")
+    still see the opening sections. Output keeps the original clause order.
+    """
+    if len(text) <= char_budget:
+        return text
+
+    chosen, used = set(), 0
+    ranked = [i for i, _ in index.search(query)]
+    for i in ranked + list(range(len(index.clauses))):
+        if i in chosen:
+            continue
+        c = index.clauses[i]
+        size = c["end"] - c["start"]
+        if used + size > char_budget:
+            continue
+        chosen.add(i)
+        used += size
+
+    parts, last = [], None
+    for i in sorted(chosen):
+        c = index.clauses[i]
+        if i != (last + 1 if last is not None else 0):
+            parts.append("\n[...]\n")
+        parts.append(text[c["start"]:c["end"]])
+        last = i
+    return "".join(parts)
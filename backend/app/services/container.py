@@ -0,0 +1,78 @@
+import asyncio
+import threading
+from app.services.batch_upload import BatchUploads
+from app.services.chat_service import ChatService
+from app.services.document_service import DocumentService
+from app.services.ingestion import ingestion_pipeline
+from app.services.session_manager import get_supabase
+
+
+class ServiceContainer:
+    """
+    Process-wide services, built on first use rather than when the route modules
+    are imported. Everything shares one Supabase client (get_supabase) and one
+    provider gateway (get_gateway); warm_up() builds it all ahead of traffic.
+
+    The properties block while a service is being built, so route handlers use
+    `await services.get(name)`: a built service comes back without locking, an
+    unbuilt one is built (or waited for) in a worker thread, off the event loop.
+    """
+
+    def __init__(self):
+        # One lock per service: building one never holds up a finished one
+        self._chat_lock = threading.Lock()
+        self._documents_lock = threading.Lock()
+        self._batches_lock = threading.Lock()
+        self._chat = None
+        self._documents = None
+        self._batches = None
+
+    async def get(self, name: str):
+        """"chat", "documents" or "batches", for use on the event loop."""
+        service = getattr(self, f"_{name}")
+        if service is None:
+            service = await asyncio.to_thread(getattr, self, name)
+        return service
+
+    @property
+    def chat(self) -> ChatService:
+        if self._chat is None:
+            with self._chat_lock:
+                if self._chat is None:
+                    self._chat = ChatService()
+        return self._chat
+
+    @property
+    def documents(self) -> DocumentService:
+        if self._documents is None:
+            with self._documents_lock:
+                if self._documents is None:
+                    self._documents = DocumentService()
+        return self._documents
+
+    @property
+    def batches(self) -> BatchUploads:
+        if self._batches is None:
+            with self._batches_lock:
+                if self._batches is None:
+                    self._batches = BatchUploads(self.documents)
+        return self._batches
+
+    @property
+    def batches_ready(self) -> bool:
+        return self._batches is not None
+
+    @property
+    def chat_ready(self) -> bool:
+        return self._chat is not None
+
+    def warm_up(self):
+        """Blocking: creates the clients, imports their SDKs and (with VECTOR_INGEST) loads the embedder. Run it off the event loop."""
+        get_supabase()
+        self.chat
+        self.documents
+        if ingestion_pipeline.embed_vectors:
+            ingestion_pipeline.vector_store.embedder
+
+
+services = ServiceContainer()
@@ -0,0 +1,78 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from app.core.config import settings
+
+
+class DocumentCache:
+    """
+    Process-wide LRU for document rows ({"filename", "content"}), bounded by bytes.
+    Entries expire after `ttl` seconds so edits made directly in Supabase are
+    eventually picked up; writes through SessionManager invalidate immediately.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._items = OrderedDict()  # doc_id -> (expires_at, size, data)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _sizeof(data: dict) -> int:
+        # getsizeof is O(1) and accounts for CPython's compact (1/2/4-byte) str storage
+        return sum(sys.getsizeof(v) for v in data.values() if isinstance(v, str))
+
+    def get(self, doc_id: str):
+        with self._lock:
+            entry = self._items.get(doc_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, data = entry
+            if expires_at < time.monotonic():
+                self._drop(doc_id)
+                self.misses += 1
+                return None
+            self._items.move_to_end(doc_id)
+            self.hits += 1
+            return data
+
+    def put(self, doc_id: str, data: dict):
+        size = self._sizeof(data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(doc_id)
+            self._items[doc_id] = (time.monotonic() + self.ttl, size, data)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._items))
+                self._drop(oldest)
+
+    def invalidate(self, doc_id: str):
+        with self._lock:
+            self._drop(doc_id)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def _drop(self, doc_id: str):
+        entry = self._items.pop(doc_id, None)
+        if entry:
+            self._bytes -= entry[1]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self):
+        return len(self._items)
+
+
+document_cache = DocumentCache(settings.DOC_CACHE_MAX_BYTES, settings.DOC_CACHE_TTL_SECONDS)
@@ -1,7 +1,12 @@
 import uuid
-from fastapi import UploadFile
 from app.services.session_manager import SessionManager
-from app.utils.pdf_parser import PDFParser
+from app.services.ingestion import ingestion_pipeline
+from app.utils.text_extractor import TextExtractor
+from app.utils.upload_intake import ReceivedFile
+from app.core.logger import get_logger
+from app.core.metrics import span, UPLOAD_BYTES
+
+logger = get_logger(__name__)
 
 class DocumentService:
     # --- SECURITY CONSTANTS ---
@@ -12,28 +17,42 @@ class DocumentService:
     def __init__(self):
         # No Pinecone, Direct Database Storage
         self.db_manager = SessionManager()
+        self.ingestion = ingestion_pipeline
 
-    async def process_upload(self, file: UploadFile):
+    async def process_upload(self, file: ReceivedFile):
+        """
+        `file` comes from upload_intake.receive_files, which already enforced
+        MAX_FILE_SIZE while streaming (413) and hashed the bytes on arrival.
+        """
         # 1. SECURITY: Check File Extension
         if not file.filename.lower().endswith(self.ALLOWED_TYPES):
             raise ValueError(f"Invalid file type. Allowed: {', '.join(self.ALLOWED_TYPES)}")
             
-        # 2. SECURITY: Check Binary Size (Fastest Check)
-        file.file.seek(0, 2) # Move cursor to end
-        file_size = file.file.tell() # Get position (size in bytes)
-        file.file.seek(0) # Reset cursor to start
-        
+        # 2. SECURITY: Binary size was capped chunk by chunk during intake
+        file_size = file.size
         if file_size > self.MAX_FILE_SIZE:
             mb_size = file_size / (1024 * 1024)
             raise ValueError(f"File too large ({mb_size:.2f}MB). Limit is 2MB.")
 
-        # 3. Parse Document
+        ext = file.filename.lower().rsplit(".", 1)[-1]
+        UPLOAD_BYTES.observe(file_size, kind=ext)
+
+        # 3. DEDUP: Identical bytes were already parsed & stored -> reuse that document
+        content_hash = file.sha256
+        with span("upload.dedup_lookup"):
+            existing_id = await self.db_manager.find_document_by_hash_async(content_hash)
+        if existing_id:
+            logger.info("Duplicate upload", extra={"doc_name": file.filename, "doc_id": existing_id})
+            return {"status": "success", "doc_id": existing_id, "duplicate": True}
+
+        # 4. Parse Document (PDF / DOCX / TXT each take their own extractor)
         try:
-            raw_text = await PDFParser.parse(file)
+            with span("upload.extract"):
+                raw_text, pages = await TextExtractor.parse(file, max_chars=self.MAX_TEXT_CHARS, with_pages=True)
             
-            # 4. SECURITY: Check Text Content Length
+            # 5. SECURITY: Check Text Content Length
             text_len = len(raw_text)
-            print(f"📄 Extracted {text_len} characters.")
+            logger.info("Text extracted", extra={"doc_name": file.filename, "chars": text_len})
             
             if text_len < 50: 
                 raise ValueError("File appears empty or is an image-based PDF.")
@@ -44,10 +63,24 @@ class DocumentService:
         except Exception as e:
             return {"status": "error", "message": str(e)}
         
-        # 5. Save Safe Content to Database
+        # 6. Save Safe Content to Database
         doc_id = str(uuid.uuid4())
-        print(f"💾 Saving clean text to Database (ID: {doc_id})...")
+        logger.info("Saving document", extra={"doc_id": doc_id})
         
-        self.db_manager.register_document(doc_id, file.filename, file_size, raw_text)
-            
-        return {"status": "success", "doc_id": doc_id}
\ No newline at end of file
+        with span("upload.register"):
+            saved = await self.db_manager.register_document_async(
+                doc_id, file.filename, file_size, raw_text, content_hash, pages
+            )
+        if not saved:
+            # Lost a race with a concurrent upload of the same file (unique content_hash)
+            existing_id = await self.db_manager.find_document_by_hash_async(content_hash)
+            if existing_id:
+                return {"status": "success", "doc_id": existing_id, "duplicate": True}
+            # A real storage failure: there is no row to chat with or to ingest
+            return {"status": "error", "message": "Could not save the document. Please try again."}
+
+        # 7. Clause index + chunk embeddings are built in the background;
+        #    chat works meanwhile and can read the progress via ingestion status
+        self.ingestion.submit(doc_id, raw_text)
+
+        return {"status": "success", "doc_id": doc_id, "ingestion": self.ingestion.status(doc_id)["state"]}
\ No newline at end of file
@@ -0,0 +1,78 @@
+import math
+import zlib
+from collections import Counter
+import numpy as np
+from app.core.config import settings
+from app.services.clause_index import tokenize
+
+# An embedder is anything with `name`, `dim`, `max_batch` and
+# `embed(texts) -> float32 array (len(texts), dim)` with L2-normalised rows.
+# The vector store records `name` per document, so switching embedders marks
+# old vectors stale instead of silently mixing spaces.
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder: signed feature hashing of the BM25 tokens plus
+    adjacent-token bigrams, sublinear TF. Deterministic across processes
+    (crc32, not Python's salted hash) so stored vectors stay valid.
+    """
+    max_batch = 1024
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str):
+        tokens = tokenize(text)
+        return Counter(tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])])
+
+    def embed(self, texts) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vec = out[row]
+            for feat, tf in self._features(text).items():
+                h = zlib.crc32(feat.encode("utf-8"))
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                vec[h % self.dim] += sign * (1.0 + math.log(tf))
+            norm = np.linalg.norm(vec)
+            if norm:
+                vec /= norm
+        return out
+
+
+class SentenceTransformerEmbedder:
+    """Optional neural embedder (pip install sentence-transformers); model loads locally."""
+    max_batch = 64
+
+    def __init__(self, model: str):
+        from sentence_transformers import SentenceTransformer  # optional dependency
+        self.model = SentenceTransformer(model)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model}"
+
+    def embed(self, texts) -> np.ndarray:
+        vectors = self.model.encode(list(texts), batch_size=self.max_batch, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def embedder_name(spec: str = None) -> str:
+    """The `name` get_embedder(spec) would have, without building it (or loading a model)."""
+    spec = spec or settings.EMBEDDER
+    kind, _, arg = spec.partition(":")
+    if kind == "hashing":
+        return f"hashing-{int(arg) if arg else 512}"
+    if kind == "sentence-transformers":
+        return f"st-{arg or 'all-MiniLM-L6-v2'}"
+    raise ValueError(f"Unknown embedder: {spec}")
+
+
+def get_embedder(spec: str = None):
+    """EMBEDDER setting: "hashing", "hashing:<dim>" or "sentence-transformers:<model>"."""
+    spec = spec or settings.EMBEDDER
+    kind, _, arg = spec.partition(":")
+    if kind == "hashing":
+        return HashingEmbedder(int(arg) if arg else 512)
+    if kind == "sentence-transformers":
+        return SentenceTransformerEmbedder(arg or "all-MiniLM-L6-v2")
+    raise ValueError(f"Unknown embedder: {spec}")
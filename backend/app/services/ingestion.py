@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import span
+from app.services.clause_index import ClauseIndexStore
+from app.services.vector_store import VectorStore
+from app.utils.clause_splitter import split_clauses
+
+logger = get_logger(__name__)
+
+
+def chunk_document(doc_id: str, text: str, chunk_chars: int = None, overlap: int = None):
+    """
+    Packs consecutive clauses into chunks of about `chunk_chars` (a clause is
+    never split across chunks; an oversized clause is a chunk on its own).
+    Every chunk but the first also repeats the last `overlap` characters of
+    the previous one. Ids depend only on the document and the chunk text, so
+    re-ingesting the same document overwrites instead of duplicating.
+    """
+    chunk_chars = chunk_chars or settings.CHUNK_CHARS
+    overlap = overlap if overlap is not None else settings.CHUNK_OVERLAP_CHARS
+
+    groups = []
+    for clause in split_clauses(text):
+        if groups and clause["end"] - groups[-1]["start"] <= chunk_chars:
+            groups[-1]["end"] = clause["end"]
+        else:
+            groups.append(dict(clause))
+
+    chunks = []
+    for i, group in enumerate(groups):
+        start = group["start"]
+        if i and overlap:
+            # Back up by `overlap` chars, snapped forward to a word boundary
+            start = max(0, start - overlap)
+            space = text.find(" ", start, group["start"])
+            start = space + 1 if space >= 0 else group["start"]
+        chunk_text = text[start:group["end"]]
+        digest = hashlib.sha1(chunk_text.encode("utf-8")).hexdigest()[:12]
+        chunks.append({
+            "id": f"{doc_id}:{i}:{digest}",
+            "text": chunk_text,
+            "heading": group["heading"],
+            "start": start,
+            "end": group["end"],
+            "chunk": i,
+        })
+    return chunks
+
+
+class IngestionPipeline:
+    """
+    Background stage run after an upload is stored: clause index, then (with
+    VECTOR_INGEST) chunk -> embed (in batches of the embedder's max_batch) ->
+    one bulk upsert per document. Uploads return as soon as the text is saved;
+    the chat path reads `status()` to know whether a document is fully indexed yet.
+    """
+    MAX_TRACKED = 10000
+
+    def __init__(self, vector_store: VectorStore = None, clause_index: ClauseIndexStore = None, workers: int = None):
+        self.vector_store = vector_store or VectorStore()
+        self.clause_index = clause_index or ClauseIndexStore()
+        self.embed_vectors = settings.VECTOR_INGEST
+        self.workers = workers or settings.INGEST_WORKERS
+        self._queue = None
+        self._tasks = []
+        self._status = OrderedDict()  # doc_id -> {"state", "chunks", "error"}
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def _set(self, doc_id: str, state: str, **extra):
+        self._status[doc_id] = {"state": state, **extra}
+        self._status.move_to_end(doc_id)
+        while len(self._status) > self.MAX_TRACKED:
+            self._status.popitem(last=False)
+
+    def status(self, doc_id: str) -> dict:
+        """queued / indexing / ready / failed, or ready/unknown from disk for documents ingested by another worker."""
+        status = self._status.get(doc_id)
+        if status:
+            return status
+        indexed = self.vector_store.has_doc(doc_id) if self.embed_vectors else self.clause_index.has(doc_id)
+        return {"state": "ready" if indexed else "unknown"}
+
+    def start(self):
+        self._queue = self._queue or asyncio.Queue()
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._run()))
+
+    def submit(self, doc_id: str, text: str):
+        # Lazily start so scripts/tests outside the app lifespan still ingest
+        self.start()
+        self._set(doc_id, "queued")
+        self._queue.put_nowait((doc_id, text))
+
+    async def stop(self):
+        """Finish everything queued, then stop the workers."""
+        if not self._tasks:
+            return
+        for _ in self._tasks:
+            self._queue.put_nowait(None)
+        await asyncio.gather(*self._tasks)
+        self._tasks = []
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            await self.ingest(*item)
+
+    async def _embed(self, texts: list):
+        embedder = self.vector_store.embedder
+        batches = [texts[i:i + embedder.max_batch] for i in range(0, len(texts), embedder.max_batch)]
+        # Errors propagate: a document without vectors must show up as failed
+        results = [await asyncio.to_thread(embedder.embed, batch) for batch in batches]
+        return [row for batch in results for row in batch]
+
+    async def ingest(self, doc_id: str, text: str):
+        self._set(doc_id, "indexing")
+        try:
+            # 1. Clause index (BM25) used by the prompt assembler
+            with span("ingest.clause_index"):
+                await asyncio.to_thread(self.clause_index.build, doc_id, text)
+            if not self.embed_vectors:
+                self._set(doc_id, "ready")
+                logger.info("Document indexed", extra={"doc_id": doc_id})
+                return
+            # 2. Chunk + embed + bulk upsert for semantic search
+            with span("ingest.chunk"):
+                chunks = await asyncio.to_thread(chunk_document, doc_id, text)
+            with span("ingest.embed"):
+                vectors = await self._embed([c["text"] for c in chunks])
+            with span("ingest.upsert"):
+                await asyncio.to_thread(self.vector_store.upsert, doc_id, chunks, vectors, True)
+            self._set(doc_id, "ready", chunks=len(chunks))
+            logger.info("Document indexed", extra={"doc_id": doc_id, "chunks": len(chunks)})
+        except Exception as e:
+            logger.error("Ingestion failed", extra={"doc_id": doc_id, "error": str(e)})
+            self._set(doc_id, "failed", error=str(e))
+
+
+ingestion_pipeline = IngestionPipeline()
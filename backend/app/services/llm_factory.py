@@ -1,33 +1,40 @@
-import google.generativeai as genai
-from groq import Groq
-from huggingface_hub import InferenceClient
-from app.core.config import settings
 from app.services.sanitizer import DataSanitizer
+from app.services.query_router import QueryRouter
+from app.services.provider_gateway import get_gateway, ProviderUnavailable, GEMINI, GROQ, HUGGINGFACE, GROQ_FALLBACK
 import json
+from app.core.logger import get_logger
+from app.core.metrics import span, PROMPT_TOKENS, PROMPT_CHARS
+from app.utils.token_counter import count_message_tokens
+
+logger = get_logger(__name__)
+
 # for render deployement i have to use groq entirely but for real production i will fine tune model or take fro hugging face
 class LLMFactory:
     def __init__(self):
         self.sanitizer = DataSanitizer()
-        genai.configure(api_key=settings.GOOGLE_API_KEY)
-        self.gemini = genai.GenerativeModel('gemini-2.0-flash')
-        self.groq_client = Groq(api_key=settings.GROQ_API_KEY)
-        self.hf_client = InferenceClient(token=settings.HF_API_KEY)
-        self.hf_model_id = settings.HF_INFERENCE_URL 
-
-    def _call_groq_router(self, prompt: str):
-        """Backup call if Google fails"""
-        completion = self.groq_client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile", 
-            response_format={"type": "json_object"}
-        )
-        return completion.choices[0].message.content
+        self.router = QueryRouter()
+        # Shared with ChatService: a provider failing here also opens its breaker there
+        self.gateway = get_gateway()
 
-    def route_query(self, user_query: str):
+    async def route_query(self, user_query: str):
         """
         Decides if the query is GENERAL (Chat) or LEGAL (RAG Search).
+        Order: decision cache -> local classifier -> Gemini -> Groq (via the gateway).
         """
         safe_query = self.sanitizer.sanitize(user_query)
+
+        cached = self.router.cache_get(safe_query)
+        if cached:
+            return cached
+
+        with span("llm.route_local"):
+            data = self.router.classify(safe_query)
+        if data:
+            data["_debug_router"] = "Local Router"
+            self.router.cache_put(safe_query, data)
+            return data
+
+        # Low confidence: escalate to the remote LLMs
         
         router_prompt = f"""
         Analyze this query: "{safe_query}"
@@ -43,31 +50,24 @@ class LLMFactory:
            }}
         """
         
-        # Attempt 1: Gemini 2.0 Flash
+        # Gemini first, Groq on failure/timeout (or hedged in if Gemini is slow)
+        router_messages = [{"role": "user", "content": router_prompt}]
+        PROMPT_TOKENS.observe(count_message_tokens(router_messages), kind="router")
+        PROMPT_CHARS.observe(len(router_prompt), kind="router")
         try:
-            response = self.gemini.generate_content(
-                router_prompt, 
-                generation_config={"response_mime_type": "application/json"}
-            )
-            data = json.loads(response.text)
-            data["_debug_router"] = "Gemini 2.0 Flash"
+            with span("llm.route_remote"):
+                raw = await self.gateway.complete(router_messages, order=[GEMINI, GROQ], json_mode=True)
+                data = json.loads(raw)
+            data["_debug_router"] = "Provider Gateway"
+            self.router.cache_put(safe_query, data)
             return data
-            
-        except Exception as e:
-            print(f"⚠️ Gemini Router Failed: {e}. Switching to Groq...")
-            
-            # Attempt 2: Groq Fallback
-            try:
-                data = json.loads(self._call_groq_router(router_prompt))
-                data["_debug_router"] = "Groq Llama 3.3"
-                return data
-            except Exception as e2:
-                print(f"❌ Groq Router Failed: {e2}")
-                return {"type": "GENERAL", "reply": "I'm having trouble connecting right now.", "_debug_router": "None"}
+        except (ProviderUnavailable, ValueError) as e:
+            logger.error("Remote router failed", extra={"error": str(e)})
+            return {"type": "GENERAL", "reply": "I'm having trouble connecting right now.", "_debug_router": "None"}
 
-    def generate_legal_answer(self, user_query: str, context: str, metadata: dict):
+    async def generate_legal_answer(self, user_query: str, context: str, metadata: dict):
         """
-        Uses Hugging Face to draft the final legal advice.
+        Uses Hugging Face to draft the final legal advice (Groq if HF is down or unset).
         """
         safe_query = self.sanitizer.sanitize(user_query)
         state = metadata.get("jurisdiction", "India")
@@ -83,15 +83,18 @@ class LLMFactory:
             {"role": "user", "content": f"Context: {context}\n\nQuestion: {safe_query}"}
         ]
 
+        PROMPT_TOKENS.observe(count_message_tokens(messages), kind="legal")
+        PROMPT_CHARS.observe(sum(len(m["content"]) for m in messages), kind="legal")
         try:
-            response = self.hf_client.chat_completion(
-                messages=messages,
-                model=self.hf_model_id, 
-                max_tokens=100,        # Further reduced to prevent token limit issues
-                temperature=0.1,       # PRECISE
-                stop=["Question:", "\n\n", "Disclaimer:"]  # Additional stop tokens
-            )
-            answer = response.choices[0].message.content.strip()
+            with span("llm.legal_answer"):
+                answer = await self.gateway.complete(
+                    messages,
+                    order=[HUGGINGFACE, GROQ, GROQ_FALLBACK],
+                    max_tokens=100,        # Further reduced to prevent token limit issues
+                    temperature=0.1,       # PRECISE
+                    stop=["Question:", "\n\n", "Disclaimer:"]  # Additional stop tokens
+                )
+            answer = answer.strip()
             
             # Truncate if still too long (safety net)
             if len(answer) > 200:
@@ -104,4 +107,5 @@ class LLMFactory:
             return final_output[:500]  # Hard limit on total output
             
         except Exception as e:
+            logger.error("Legal answer failed", extra={"error": str(e)})
             return f"Legal Model Error: {str(e)}"
\ No newline at end of file
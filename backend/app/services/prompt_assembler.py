@@ -0,0 +1,229 @@
+import threading
+from collections import OrderedDict
+from app.core.config import settings
+from app.services.clause_index import select_clauses
+from app.services.clause_diff import is_comparison
+from app.utils.token_counter import count_tokens, count_message_tokens, truncate_to_tokens
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+NO_DOCUMENTS = "No documents found in context. Answer based on general legal knowledge."
+DOC_HEADER = "\n--- START DOCUMENT: {filename} ---\n"
+DOC_FOOTER = "\n--- END DOCUMENT ---\n"
+COMPARISON_HEADER = "\n--- CLAUSE COMPARISON: {name_a} vs {name_b} (aligned clauses; identical ones only listed) ---\n"
+
+USER_TEMPLATE = """
+        CHAT HISTORY:
+        {history}
+
+        ACTIVE DOCUMENTS:
+        {context}
+
+        QUESTION:
+        {question}
+        """
+
+
+class PromptAssembler:
+    """
+    Fits one chat turn into PROMPT_TOKEN_BUDGET input tokens.
+    System prompt and question always go in; history takes the newest messages
+    up to HISTORY_TOKEN_BUDGET; documents share what's left, smallest first, so
+    a short document keeps its full text and its unused share goes to the long
+    ones (which are cut down to their most relevant clauses).
+    CPU-only: callers run `assemble` off the event loop.
+    """
+    MAX_CACHED_COUNTS = 256
+
+    def __init__(self, clause_index, budget: int = None, history_budget: int = None, aligner=None):
+        self.clause_index = clause_index
+        # Optional ClauseAligner: comparison questions over 2+ documents then get
+        # the aligned differing clauses instead of (cut-down) full texts
+        self.aligner = aligner
+        self.budget = budget or settings.PROMPT_TOKEN_BUDGET
+        self.history_budget = history_budget if history_budget is not None else settings.HISTORY_TOKEN_BUDGET
+        self._doc_tokens = OrderedDict()  # (doc_id, content length) -> token count
+        self._doc_tokens_lock = threading.Lock()  # assemble runs in worker threads, several turns at once
+
+    def _count_doc(self, doc_id: str, text: str) -> int:
+        key = (doc_id, len(text))
+        with self._doc_tokens_lock:
+            tokens = self._doc_tokens.get(key)
+            if tokens is not None:
+                self._doc_tokens.move_to_end(key)
+                return tokens
+        # Counted outside the lock; two turns may both count a new document, same result
+        tokens = count_tokens(text)
+        with self._doc_tokens_lock:
+            self._doc_tokens[key] = tokens
+            self._doc_tokens.move_to_end(key)
+            while len(self._doc_tokens) > self.MAX_CACHED_COUNTS:
+                self._doc_tokens.popitem(last=False)
+        return tokens
+
+    def _fit_history(self, history: list, budget: int, summary: str = ""):
+        """
+        Rolling summary first (up to half the budget), then the newest messages
+        that fit. Returns (text, tokens, messages kept, summary tokens).
+        """
+        summary_line, summary_tokens = "", 0
+        if summary:
+            summary_line = truncate_to_tokens(f"summary of earlier conversation: {summary}", budget // 2)
+            summary_tokens = count_tokens(summary_line) + 1
+        kept, used = [], summary_tokens
+        for msg in reversed(history):
+            line = f"{msg['role']}: {msg['content']}"
+            tokens = count_tokens(line) + 1
+            if used + tokens > budget:
+                break
+            kept.append(line)
+            used += tokens
+        kept.reverse()
+        return "\n".join(([summary_line] if summary_line else []) + kept), used, len(kept), summary_tokens
+
+    def _fit_document(self, doc_id: str, text: str, tokens: int, allowance: int, question: str) -> str:
+        if tokens <= allowance:
+            return text
+        # Clause selection works in characters: convert with this document's own ratio
+        char_budget = int(allowance * len(text) / max(1, tokens))
+        index = self.clause_index.get(doc_id, text)
+        fitted = select_clauses(index, text, question, char_budget)
+        if count_tokens(fitted) > allowance:
+            fitted = truncate_to_tokens(fitted, allowance)
+        return fitted
+
+    def _clip(self, text: str) -> str:
+        text = " ".join(text.split())
+        limit = settings.COMPARE_CLAUSE_CHARS
+        return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + " …"
+
+    def _fit_comparison(self, doc_a: tuple, doc_b: tuple, question: str, allowance: int):
+        """
+        One section comparing doc_b against doc_a. Differences are ranked by
+        relevance to the question plus how different they are, packed into
+        `allowance` tokens, then printed in document order. Returns (text, counts).
+        """
+        (id_a, name_a, text_a), (id_b, name_b, text_b) = doc_a, doc_b
+        entries = self.aligner.get((id_a, text_a), (id_b, text_b))
+        index_a, index_b = self.clause_index.get(id_a, text_a), self.clause_index.get(id_b, text_b)
+        relevance_a, relevance_b = dict(index_a.search(question)), dict(index_b.search(question))
+        top = max(list(relevance_a.values()) + list(relevance_b.values()) + [1.0])
+
+        blocks, same, counts = [], [], {"changed": 0, "only": 0, "same": 0}
+        for n, e in enumerate(entries):
+            a = text_a[index_a.clauses[e["a"]]["start"]:index_a.clauses[e["a"]]["end"]] if e["a"] is not None else ""
+            b = text_b[index_b.clauses[e["b"]]["start"]:index_b.clauses[e["b"]]["end"]] if e["b"] is not None else ""
+            label = e["heading"] or (f"Clause {e['a'] + 1}" if e["a"] is not None else f"Clause {e['b'] + 1} of {name_b}")
+            relevance = max(relevance_a.get(e["a"], 0.0), relevance_b.get(e["b"], 0.0)) / top
+            if e["status"] == "same":
+                same.append(label)
+                counts["same"] += 1
+                continue
+            if e["status"] == "changed":
+                counts["changed"] += 1
+                block = (f"[{label}] DIFFERS (similarity {e['similarity']:.2f})\n"
+                         f"{name_a}: {self._clip(a)}\n{name_b}: {self._clip(b)}\n"
+                         f"Changes ([-{name_a}-] {{+{name_b}+}}): {e['diff']}\n")
+                priority = relevance + 1 - e["similarity"]
+            else:
+                counts["only"] += 1
+                owner, body = (name_a, a) if e["status"] == "only_a" else (name_b, b)
+                block = f"[{label}] ONLY IN {owner}: {self._clip(body)}\n"
+                priority = relevance + 0.5
+            blocks.append((priority, n, block))
+
+        header = COMPARISON_HEADER.format(name_a=name_a, name_b=name_b)
+        footer = ("Identical in both: " + "; ".join(same[:40]) + "\n") if same else ""
+        if not blocks:
+            footer += "No differing clauses found.\n"
+        used = count_tokens(header + footer)
+        chosen = []
+        for priority, n, block in sorted(blocks, key=lambda b: (-b[0], b[1])):
+            tokens = count_tokens(block)
+            if used + tokens > allowance:
+                continue
+            chosen.append((n, block))
+            used += tokens
+        if len(chosen) < len(blocks):
+            footer += f"({len(blocks) - len(chosen)} less relevant differences omitted for length.)\n"
+        return header + "".join(block for _, block in sorted(chosen)) + footer, counts
+
+    def assemble(self, system_prompt: str, history: list, documents: list, question: str, summary: str = ""):
+        """
+        `documents` is [(doc_id, filename, text)]; `history` is the verbatim tail
+        and `summary` the session's rolling summary of everything before it.
+        Returns (messages, context_parts, report) where report has the token
+        count of every section and of the final prompt.
+        """
+        fixed = count_message_tokens([
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": USER_TEMPLATE.format(
+                history="", context="" if documents else NO_DOCUMENTS, question=question
+            )},
+        ])
+        history_text, history_tokens, history_count, summary_tokens = self._fit_history(
+            history, max(0, min(self.history_budget, self.budget - fixed)), summary
+        )
+
+        # Water-fill the remaining budget over the documents, smallest first
+        remaining = max(0, self.budget - fixed - history_tokens)
+        sized = []
+        for doc_id, filename, text in documents:
+            wrapper = count_tokens(DOC_HEADER.format(filename=filename) + DOC_FOOTER)
+            sized.append((self._count_doc(doc_id, text), wrapper, doc_id, filename, text))
+        allowances = [0] * len(sized)
+        by_size = sorted(range(len(sized)), key=lambda i: sized[i][0])
+        for n, i in enumerate(by_size):
+            tokens, wrapper = sized[i][:2]
+            allowances[i] = min(tokens + wrapper, remaining // (len(sized) - n))
+            remaining -= allowances[i]
+
+        context_parts, doc_report, comparison = [], {}, None
+        if self.aligner is not None and is_comparison(question, len(documents)):
+            # The first document is the baseline every other one is compared against
+            remaining = max(0, self.budget - fixed - history_tokens)
+            comparison = {"pairs": 0, "changed": 0, "only": 0, "same": 0}
+            for n, other in enumerate(documents[1:]):
+                section, counts = self._fit_comparison(
+                    documents[0], other, question, remaining // (len(documents) - 1 - n)
+                )
+                context_parts.append(section)
+                doc_report[other[0]] = count_tokens(section)
+                remaining -= doc_report[other[0]]
+                comparison["pairs"] += 1
+                for key, value in counts.items():
+                    comparison[key] += value
+            sized = []  # the full texts are not sent
+
+        for (tokens, wrapper, doc_id, filename, text), allowance in zip(sized, allowances):
+            allowance -= wrapper
+            if allowance <= 0:
+                logger.warning("Token budget exhausted, dropping document", extra={"doc_id": doc_id, "doc_name": filename})
+                doc_report[doc_id] = 0
+                continue
+            fitted = self._fit_document(doc_id, text, tokens, allowance, question)
+            context_parts.append(DOC_HEADER.format(filename=filename) + fitted + DOC_FOOTER)
+            doc_report[doc_id] = count_tokens(fitted) + wrapper
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": USER_TEMPLATE.format(
+                history=history_text,
+                context="\n".join(context_parts) or NO_DOCUMENTS,
+                question=question,
+            )},
+        ]
+        report = {
+            "budget": self.budget,
+            "system": count_tokens(system_prompt),
+            "history": history_tokens,
+            "history_messages": history_count,
+            "summary": summary_tokens,
+            "documents": doc_report,
+            "question": count_tokens(question),
+            "total": count_message_tokens(messages),
+        }
+        if comparison:
+            report["comparison"] = comparison
+        return messages, context_parts, report
@@ -0,0 +1,351 @@
+import asyncio
+import time
+from collections import deque
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.metrics import PROVIDER_CALLS, PROVIDER_SECONDS
+
+logger = get_logger(__name__)
+
+
+class ProviderUnavailable(Exception):
+    """Every provider failed, timed out or had its circuit open."""
+
+
+# --- PROVIDERS ---
+# Anything with a `name` and `async complete(messages, **opts) -> str` can be used
+# by the gateway (`stream` is optional), which is how tests plug in local fakes.
+
+class GroqProvider:
+    def __init__(self, client, model: str, name: str = "groq"):
+        self.client = client
+        self.model = model
+        self.name = name
+
+    async def complete(self, messages, temperature: float = 0.1, max_tokens: int = None,
+                       stop=None, json_mode: bool = False):
+        kwargs = {"messages": messages, "model": self.model, "temperature": temperature}
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+        if stop:
+            kwargs["stop"] = stop
+        if json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
+        completion = await self.client.chat.completions.create(**kwargs)
+        return completion.choices[0].message.content
+
+    async def stream(self, messages, temperature: float = 0.1):
+        stream = await self.client.chat.completions.create(
+            messages=messages, model=self.model, temperature=temperature, stream=True
+        )
+        try:
+            async for chunk in stream:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    yield token
+        finally:
+            await stream.close()  # drops the HTTP response if we stop early
+
+
+class GeminiProvider:
+    def __init__(self, api_key: str, model: str = "gemini-2.0-flash", name: str = "gemini"):
+        import google.generativeai as genai  # heavy SDK: only loaded when Gemini is configured
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model)
+        self.name = name
+
+    async def complete(self, messages, temperature: float = 0.1, max_tokens: int = None,
+                       stop=None, json_mode: bool = False):
+        prompt = "\n\n".join(m["content"] for m in messages)
+        config = {"temperature": temperature}
+        if max_tokens:
+            config["max_output_tokens"] = max_tokens
+        if stop:
+            config["stop_sequences"] = stop
+        if json_mode:
+            config["response_mime_type"] = "application/json"
+        response = await self.model.generate_content_async(prompt, generation_config=config)
+        return response.text
+
+
+class HuggingFaceProvider:
+    def __init__(self, token: str, model: str, name: str = "huggingface"):
+        from huggingface_hub import AsyncInferenceClient  # optional dependency
+        self.client = AsyncInferenceClient(token=token)
+        self.model = model
+        self.name = name
+
+    async def complete(self, messages, temperature: float = 0.1, max_tokens: int = None,
+                       stop=None, json_mode: bool = False):
+        response = await self.client.chat_completion(
+            messages=messages, model=self.model, max_tokens=max_tokens,
+            temperature=temperature, stop=stop
+        )
+        return response.choices[0].message.content
+
+
+# --- CIRCUIT BREAKER ---
+
+class CircuitBreaker:
+    """
+    Rolling window of the last `window` calls for one provider. Opens when the
+    error rate reaches `error_rate` (after `min_calls`), stays open for
+    `cooldown` seconds, then lets a single probe through (half-open).
+    Successful latencies feed the percentile used to time hedged requests.
+    """
+
+    def __init__(self, window: int = None, error_rate: float = None, min_calls: int = None, cooldown: float = None):
+        self.window = window or settings.BREAKER_WINDOW
+        self.error_rate_threshold = error_rate if error_rate is not None else settings.BREAKER_ERROR_RATE
+        self.min_calls = min_calls or settings.BREAKER_MIN_CALLS
+        self.cooldown = cooldown if cooldown is not None else settings.BREAKER_COOLDOWN_SECONDS
+        self._results = deque(maxlen=self.window)     # True/False per call
+        self._latencies = deque(maxlen=self.window)   # seconds, successful calls only
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    @property
+    def error_rate(self) -> float:
+        return (self._results.count(False) / len(self._results)) if self._results else 0.0
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release(self):
+        """A probe that ended without a verdict (e.g. cancelled) frees the half-open slot."""
+        self._probing = False
+
+    def record(self, ok: bool, latency: float = None):
+        self._results.append(ok)
+        if ok and latency is not None:
+            self._latencies.append(latency)
+        if self._probing:
+            self._probing = False
+            if ok:
+                self._opened_at = None
+                self._results.clear()
+            else:
+                self._opened_at = time.monotonic()
+            return
+        if len(self._results) >= self.min_calls and self.error_rate >= self.error_rate_threshold:
+            self._opened_at = time.monotonic()
+
+    def latency_percentile(self, pct: float):
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+
+# --- GATEWAY ---
+
+class ProviderGateway:
+    """
+    Ordered failover across providers with a deadline per call and a circuit
+    breaker per provider. With hedging on, if the first provider hasn't
+    answered by its own p`hedge_percentile` latency a second provider is started
+    and whichever answers first wins (the loser is cancelled).
+    """
+
+    def __init__(self, providers, timeout: float = None, hedge_percentile: float = None, min_hedge_delay: float = 0.5,
+                 stream_idle_timeout: float = None, stream_timeout: float = None):
+        self.providers = [p for p in providers if p is not None]
+        self.timeout = timeout or settings.LLM_TIMEOUT_SECONDS
+        self.stream_idle_timeout = stream_idle_timeout or settings.LLM_STREAM_IDLE_SECONDS
+        self.stream_timeout = stream_timeout or settings.LLM_STREAM_TIMEOUT_SECONDS
+        self.hedge_percentile = hedge_percentile if hedge_percentile is not None else settings.LLM_HEDGE_PERCENTILE
+        self.min_hedge_delay = min_hedge_delay
+        self.breakers = {p.name: CircuitBreaker() for p in self.providers}
+
+    def _candidates(self, order=None):
+        """Providers to try, in order. `order` picks/reorders by name; unknown names are skipped."""
+        if order is None:
+            return list(self.providers)
+        by_name = {p.name: p for p in self.providers}
+        return [by_name[name] for name in order if name in by_name]
+
+    def _next(self, candidates: list):
+        """Pops the next provider whose circuit lets a call through."""
+        while candidates:
+            provider = candidates.pop(0)
+            if self.breakers[provider.name].allow():
+                return provider
+            PROVIDER_CALLS.inc(provider=provider.name, outcome="circuit_open")
+        return None
+
+    def _record(self, provider, ok: bool, latency: float = None, outcome: str = None):
+        self.breakers[provider.name].record(ok, latency)
+        PROVIDER_CALLS.inc(provider=provider.name, outcome=outcome or ("ok" if ok else "error"))
+        if ok and latency is not None:
+            PROVIDER_SECONDS.observe(latency, provider=provider.name)
+
+    async def _attempt(self, provider, messages, timeout: float, opts: dict):
+        breaker = self.breakers[provider.name]
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(provider.complete(messages, **opts), timeout)
+        except asyncio.CancelledError:
+            # Lost a hedge race: neither a success nor the provider's fault
+            breaker.release()
+            PROVIDER_CALLS.inc(provider=provider.name, outcome="cancelled")
+            raise
+        except asyncio.TimeoutError:
+            self._record(provider, False, outcome="timeout")
+            raise
+        except Exception:
+            self._record(provider, False)
+            raise
+        self._record(provider, True, time.monotonic() - start)
+        return result
+
+    def _hedge_delay(self, provider):
+        if not self.hedge_percentile:
+            return None
+        observed = self.breakers[provider.name].latency_percentile(self.hedge_percentile)
+        return max(self.min_hedge_delay, observed) if observed is not None else None
+
+    async def complete(self, messages, order=None, deadline: float = None, **opts) -> str:
+        """
+        Returns the first successful completion. `deadline` (seconds) bounds the
+        whole call including failovers; each attempt is also capped at `timeout`.
+        """
+        loop = asyncio.get_running_loop()
+        candidates = self._candidates(order)
+        end = loop.time() + (deadline or self.timeout * max(1, len(candidates)))
+        errors = []
+
+        while True:
+            remaining = end - loop.time()
+            primary = self._next(candidates) if remaining > 0 else None
+            if primary is None:
+                break
+            attempt_timeout = min(self.timeout, remaining)
+            primary_task = asyncio.ensure_future(self._attempt(primary, messages, attempt_timeout, opts))
+            tasks = {primary_task: primary}
+
+            delay = self._hedge_delay(primary)
+            if delay is not None and candidates and delay < attempt_timeout:
+                done, _ = await asyncio.wait({primary_task}, timeout=delay)
+                backup = None if done else self._next(candidates)
+                if backup:
+                    logger.info("Hedging provider call", extra={
+                        "provider": primary.name, "backup": backup.name, "after_seconds": round(delay, 3)
+                    })
+                    PROVIDER_CALLS.inc(provider=backup.name, outcome="hedge")
+                    backup_timeout = min(self.timeout, end - loop.time())
+                    tasks[asyncio.ensure_future(self._attempt(backup, messages, backup_timeout, opts))] = backup
+
+            try:
+                while tasks:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        provider = tasks.pop(task)
+                        if task.exception() is None:
+                            return task.result()
+                        errors.append(f"{provider.name}: {task.exception()!r}")
+                        logger.warning("Provider failed", extra={"provider": provider.name, "error": repr(task.exception())})
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        detail = "; ".join(errors) or "all circuits open or deadline exceeded"
+        raise ProviderUnavailable(f"No LLM provider available ({detail})")
+
+    async def stream(self, messages, order=None, **opts):
+        """
+        Streams tokens from the first healthy provider that supports streaming.
+        Failover is only possible until the first token arrives. After that a
+        gap over `stream_idle_timeout`, or the whole stream running past
+        `stream_timeout`, ends it with ProviderUnavailable rather than holding
+        the caller's LLM slot on a stalled upstream.
+        """
+        errors = []
+        candidates = [p for p in self._candidates(order) if hasattr(p, "stream")]
+        while True:
+            provider = self._next(candidates)
+            if provider is None:
+                break
+            breaker = self.breakers[provider.name]
+            start = time.monotonic()
+            agen = provider.stream(messages, **opts).__aiter__()
+            try:
+                try:
+                    first = await asyncio.wait_for(agen.__anext__(), self.timeout)
+                except asyncio.CancelledError:
+                    breaker.release()
+                    raise
+                except StopAsyncIteration:
+                    self._record(provider, True, time.monotonic() - start)
+                    return
+                except Exception as e:
+                    self._record(provider, False, outcome="timeout" if isinstance(e, asyncio.TimeoutError) else "error")
+                    errors.append(f"{provider.name}: {e!r}")
+                    logger.warning("Provider failed before first token", extra={"provider": provider.name, "error": repr(e)})
+                    continue
+                # Latency to first token: what the breaker and hedging care about
+                self._record(provider, True, time.monotonic() - start)
+                yield first
+                end = start + self.stream_timeout
+                while True:
+                    wait = min(self.stream_idle_timeout, end - time.monotonic())
+                    try:
+                        if wait <= 0:
+                            raise asyncio.TimeoutError()
+                        token = await asyncio.wait_for(agen.__anext__(), wait)
+                    except StopAsyncIteration:
+                        return
+                    except asyncio.TimeoutError:
+                        PROVIDER_CALLS.inc(provider=provider.name, outcome="stream_timeout")
+                        logger.warning("Provider stream stalled", extra={
+                            "provider": provider.name, "seconds": round(time.monotonic() - start, 3)
+                        })
+                        raise ProviderUnavailable(f"{provider.name} stopped streaming")
+                    yield token
+            finally:
+                # Abandoned, failed or finished: release the upstream connection either way
+                aclose = getattr(agen, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+        raise ProviderUnavailable(f"No streaming LLM provider available ({'; '.join(errors) or 'all circuits open'})")
+
+
+# Provider names used across services
+GROQ = "groq"
+GROQ_FALLBACK = "groq-fallback"
+GEMINI = "gemini"
+HUGGINGFACE = "huggingface"
+
+_gateway = None
+
+
+def get_gateway() -> ProviderGateway:
+    """
+    Process-wide gateway so every service shares one circuit breaker per provider.
+    Optional providers are only built (and their SDKs imported) when configured.
+    """
+    global _gateway
+    if _gateway is None:
+        from groq import AsyncGroq
+        groq_client = AsyncGroq(api_key=settings.GROQ_API_KEY)
+        providers = [
+            GroqProvider(groq_client, settings.LLM_MODEL, name=GROQ),
+            GroqProvider(groq_client, settings.LLM_FALLBACK_MODEL, name=GROQ_FALLBACK) if settings.LLM_FALLBACK_MODEL else None,
+            GeminiProvider(settings.GOOGLE_API_KEY) if settings.GOOGLE_API_KEY else None,
+            HuggingFaceProvider(settings.HF_API_KEY, settings.HF_INFERENCE_URL) if settings.HF_API_KEY and settings.HF_INFERENCE_URL else None,
+        ]
+        _gateway = ProviderGateway(providers)
+    return _gateway
@@ -0,0 +1,177 @@
+import json
+import math
+import re
+import sys
+import threading
+from collections import OrderedDict
+from app.core.config import settings
+from app.services.clause_index import tokenize
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Seed lexicons. They double as features for the linear model and as the
+# keyword source for LEGAL decisions.
+LEGAL_TERMS = frozenset(tokenize("""
+    law laws legal lawyer advocate attorney court courts judge judgment tribunal appeal petition
+    contract contracts agreement agreements clause clauses lease tenant landlord rent deposit
+    termination terminate breach penalty penalties liability liable indemnity indemnify warranty
+    arbitration jurisdiction governing dispute damages compensation notice obligation obligations
+    party parties signed signatory consideration confidentiality nda non-compete employment employer
+    employee salary severance property deed will estate inheritance divorce custody crime criminal
+    police fir bail offence offense ipc section act statute regulation compliance gst tax copyright
+    trademark patent license licence rights sue lawsuit claim eviction renewal payment refund
+    document uploaded
+"""))
+GREETINGS = frozenset("hi hello hey hiya yo namaste good morning evening afternoon".split())
+THANKS = frozenset("thanks thank thx cheers appreciate appreciated".split())
+OFF_TOPIC = frozenset(tokenize("joke funny poem code python javascript math calculate weather recipe movie song"))
+
+CANNED_REPLIES = {
+    "greeting": "Hello! Upload a contract or ask me any legal question and I'll help you review it.",
+    "thanks": "You're welcome! Let me know if there's anything else in your documents you'd like checked.",
+}
+
+NORMALIZE_RE = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(NORMALIZE_RE.sub(" ", query.lower()).split())
+
+
+def _features(query: str):
+    words = normalize_query(query).split()
+    tokens = tokenize(query)
+    feats = {f"w:{t}": 1.0 for t in tokens}
+    legal_hits = sum(1 for t in tokens if t in LEGAL_TERMS)
+    feats["lex:legal"] = float(legal_hits)
+    feats["lex:greeting"] = float(sum(1 for w in words if w in GREETINGS))
+    feats["lex:thanks"] = float(sum(1 for w in words if w in THANKS))
+    feats["lex:offtopic"] = float(sum(1 for t in tokens if t in OFF_TOPIC))
+    feats["len:short"] = 1.0 if len(words) <= 3 else 0.0
+    feats["len:question"] = 1.0 if "?" in query else 0.0
+    return feats
+
+
+class QueryRouter:
+    """
+    Local GENERAL vs LEGAL classifier: lexicon features + a logistic-regression
+    model (weights trained offline, see `train` / `__main__`). Without a trained
+    model file it falls back to hand-set lexicon weights. Decisions below
+    ROUTER_CONFIDENCE return None so the caller can escalate to a remote LLM.
+    """
+    DEFAULT_WEIGHTS = {
+        "lex:legal": 2.5,
+        "lex:greeting": -2.5,
+        "lex:thanks": -3.0,
+        "lex:offtopic": -1.5,
+        "len:short": -0.5,
+        "len:question": 0.3,
+    }
+    DEFAULT_BIAS = 0.0
+
+    def __init__(self, model_path: str = None, confidence: float = None, cache_size: int = None):
+        self.weights = dict(self.DEFAULT_WEIGHTS)
+        self.bias = self.DEFAULT_BIAS
+        self.confidence = confidence if confidence is not None else settings.ROUTER_CONFIDENCE
+        self.cache_size = cache_size if cache_size is not None else settings.ROUTER_CACHE_SIZE
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        path = model_path if model_path is not None else settings.ROUTER_MODEL_PATH
+        if path:
+            self.load(path)
+
+    # --- Model ---
+    def prob_legal(self, query: str) -> float:
+        z = self.bias + sum(self.weights.get(f, 0.0) * v for f, v in _features(query).items())
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+
+    def classify(self, query: str):
+        """Returns a route_query-shaped dict, or None when the model isn't confident."""
+        p = self.prob_legal(query)
+        if p >= self.confidence:
+            keywords = [t for t in dict.fromkeys(tokenize(query)) if t in LEGAL_TERMS][:5]
+            return {
+                "type": "LEGAL",
+                "metadata": {"jurisdiction": "India", "keywords": keywords or tokenize(query)[:3]},
+                "_confidence": round(p, 3),
+            }
+        if 1.0 - p >= self.confidence:
+            # Only small talk has a reply we can give locally; jokes/code/math still go remote
+            feats = _features(query)
+            kind = "thanks" if feats["lex:thanks"] else "greeting" if feats["lex:greeting"] else None
+            if kind:
+                return {"type": "GENERAL", "reply": CANNED_REPLIES[kind], "_confidence": round(1.0 - p, 3)}
+        return None
+
+    def train(self, samples, epochs: int = 20, lr: float = 0.1, l2: float = 1e-4):
+        """SGD logistic regression over (query, label) pairs, label in {"LEGAL", "GENERAL"}."""
+        data = [(_features(q), 1.0 if label.upper() == "LEGAL" else 0.0) for q, label in samples]
+        for _ in range(epochs):
+            for feats, y in data:
+                z = self.bias + sum(self.weights.get(f, 0.0) * v for f, v in feats.items())
+                err = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z)))) - y
+                self.bias -= lr * err
+                for f, v in feats.items():
+                    w = self.weights.get(f, 0.0)
+                    self.weights[f] = w - lr * (err * v + l2 * w)
+        self.clear_cache()
+        return self
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "bias": self.bias, "weights": self.weights}, f)
+
+    def load(self, path: str):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.bias = data["bias"]
+            self.weights = data["weights"]
+            self.clear_cache()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Router model load failed, using lexicon weights", extra={"path": path, "error": str(e)})
+
+    # --- Decision cache (normalized query -> routing decision) ---
+    def cache_get(self, query: str):
+        key = normalize_query(query)
+        with self._lock:
+            decision = self._cache.get(key)
+            if decision is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+        return json.loads(decision)
+
+    def cache_put(self, query: str, decision: dict):
+        if not self.cache_size:
+            return
+        key = normalize_query(query)
+        # Stored serialized so callers can't mutate the cached copy
+        with self._lock:
+            self._cache[key] = json.dumps(decision)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+
+if __name__ == "__main__":
+    # Offline training: python -m app.services.query_router samples.jsonl router_model.json
+    # where each line is {"query": "...", "label": "LEGAL" | "GENERAL"}
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m app.services.query_router <samples.jsonl> <out_model.json>")
+    with open(sys.argv[1], encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    router = QueryRouter(model_path="").train([(r["query"], r["label"]) for r in rows])
+    router.save(sys.argv[2])
+    correct = sum(
+        (router.prob_legal(r["query"]) >= 0.5) == (r["label"].upper() == "LEGAL") for r in rows
+    )
+    print(f"Trained on {len(rows)} samples, training accuracy {correct / max(1, len(rows)):.1%}")
@@ -1,33 +1,138 @@
-from groq import Groq
+import re
+from bisect import bisect_left
 from app.core.config import settings
-#groq sanatizer is used for easy deployment on render otehrwise i will use spacy
+from app.utils.aho_corasick import Automaton
+from app.utils.pii_gazetteer import FIRST_NAMES, AMBIGUOUS_NAMES, HONORIFICS
+from app.core.logger import get_logger
+# Local redaction engine: compiled patterns + a gazetteer automaton. No network
+# call, no truncation, so it is cheap enough to run on every query and full documents.
+
+logger = get_logger(__name__)
+
+EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+PHONE_RE = re.compile(
+    r"(?<![\w/])(?:"
+    r"\+\d{1,3}[\s.-]?\(?\d{1,4}\)?(?:[\s.-]?\d{2,4}){2,4}"     # +91 98765 43210, +1 (212) 555-0100
+    r"|\(?0?\d{2,4}\)?[\s.-]\d{3,4}[\s.-]\d{3,4}"               # (022) 2345 6789, 212-555-0100
+    r"|(?:0|\+91[\s-]?)?[6-9]\d{4}[\s-]?\d{5}"                  # Indian mobile: 98765 43210, 09876543210
+    r")(?![\w/])"
+)
+# A number right after a currency or reference label is not a phone ("Rs 7500000000", "Invoice No. 9123456789")
+NOT_PHONE_BEFORE_RE = re.compile(
+    r"(?:[₹$€£]|\b(?:rs|inr|usd|eur|gbp)\.?|\b(?:ref|reference|invoice|account|a/c|policy)\.?(?:\s*no\.?)?)[\s:#-]*$",
+    re.IGNORECASE,
+)
+ID_RE = re.compile(
+    r"\b(?:"
+    r"\d{4}[\s-]\d{4}[\s-]\d{4}"          # Aadhaar
+    r"|[A-Z]{5}\d{4}[A-Z]"                # PAN
+    r"|\d{3}-\d{2}-\d{4}"                 # US SSN
+    r"|[A-Z]\d{7}"                        # Indian passport
+    r"|(?:\d{4}[\s-]?){3}\d{4}"           # Card numbers
+    r")\b"
+)
+ADDRESS_RE = re.compile(
+    r"\b\d{1,5}[A-Za-z]?,?\s+(?:[A-Z][\w.'-]*\s+){1,5}"
+    r"(?:Street|St\.?|Road|Rd\.?|Lane|Ln\.?|Avenue|Ave\.?|Boulevard|Blvd\.?|Drive|Dr\.?|Marg|Nagar|Colony|Sector|Block)\b"
+    r"(?:,?\s+[A-Z][\w.'-]*){0,3}(?:,?\s*(?:-\s*)?\d{5,6})?"
+)
+HONORIFIC_NAME_RE = re.compile(
+    r"\b(?:%s)\.?\s+(?:[A-Z][a-z]+|[A-Z]\.)(?:\s+(?:[A-Z][a-z]+|[A-Z]\.)){0,2}" % "|".join(
+        h.capitalize() for h in HONORIFICS
+    )
+)
+CAPITALIZED_WORD_RE = re.compile(r"\s+([A-Z][a-z]+)")
+
+# Higher wins when two detectors claim overlapping text
+PRIORITY = {"[EMAIL]": 5, "[ID]": 4, "[PHONE]": 3, "[ADDRESS]": 2, "[CLIENT]": 1}
+
+
+def _load_names():
+    # Ambiguous names are matched too; _name_spans only keeps them with a surname
+    names = set(FIRST_NAMES) | AMBIGUOUS_NAMES
+    if settings.PII_GAZETTEER_PATH:
+        try:
+            with open(settings.PII_GAZETTEER_PATH, encoding="utf-8") as f:
+                names.update(line.strip().lower() for line in f if line.strip())
+        except OSError as e:
+            logger.warning("Gazetteer load failed", extra={"path": settings.PII_GAZETTEER_PATH, "error": str(e)})
+    automaton = Automaton()
+    for name in names:
+        automaton.add(name)
+    return automaton.build()
+
+
+def _lower_aligned(text: str) -> str:
+    """
+    text.lower() with the same length, so match offsets index `text` too.
+    A few characters lowercase to more than one code point ('İ' -> 'i̇');
+    those are kept as they are (they are never part of a gazetteer name).
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(low if len(low) == 1 else ch for ch, low in ((ch, ch.lower()) for ch in text))
+
+
 class DataSanitizer:
+    # Built once per process; the automaton is read-only after build()
+    _names = None
+
     def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        if DataSanitizer._names is None:
+            DataSanitizer._names = _load_names()
+
+    def _name_spans(self, text: str):
+        lowered = _lower_aligned(text)
+        for start, end, name in self._names.iter(lowered):
+            # Whole, Capitalized words only ("Rahul", not "rahul" or "Rahulnagar")
+            if (start and lowered[start - 1].isalnum()) or (end < len(text) and text[end].isalnum()):
+                continue
+            if not text[start].isupper():
+                continue
+            # Extend over a following surname or two ("Priya Sharma Iyer")
+            span_end = end
+            for _ in range(2):
+                m = CAPITALIZED_WORD_RE.match(text, span_end)
+                if not m:
+                    break
+                span_end = m.end()
+            if name in AMBIGUOUS_NAMES and span_end == end:
+                continue
+            yield start, span_end, "[CLIENT]"
+
+    def find_pii(self, text: str):
+        """All (start, end, placeholder) spans, overlaps resolved, in text order."""
+        spans = []
+        for regex, tag in ((EMAIL_RE, "[EMAIL]"), (ID_RE, "[ID]"), (PHONE_RE, "[PHONE]"),
+                           (ADDRESS_RE, "[ADDRESS]"), (HONORIFIC_NAME_RE, "[CLIENT]")):
+            spans.extend((m.start(), m.end(), tag) for m in regex.finditer(text))
+        spans = [s for s in spans
+                 if s[2] != "[PHONE]" or not NOT_PHONE_BEFORE_RE.search(text, max(0, s[0] - 16), s[0])]
+        spans.extend(self._name_spans(text))
+
+        # Greedy by priority, then length; drop anything overlapping an accepted span
+        spans.sort(key=lambda s: (-PRIORITY[s[2]], -(s[1] - s[0]), s[0]))
+        accepted, starts = [], []  # kept sorted and non-overlapping
+        for span in spans:
+            i = bisect_left(starts, span[0])
+            if i and accepted[i - 1][1] > span[0]:
+                continue
+            if i < len(accepted) and accepted[i][0] < span[1]:
+                continue
+            accepted.insert(i, span)
+            starts.insert(i, span[0])
+        return accepted
 
     def sanitize(self, text: str) -> str:
         # Simple heuristic to skip short/empty texts
         if len(text) < 10:
             return text
 
-        prompt = f"""
-        Task: Redact PII (Person Names, Emails, Phone Numbers) from the text below.
-        Replace with [CLIENT], [EMAIL], [PHONE].
-        Keep all other legal details intact.
-        Output ONLY the sanitized text.
-        
-        Text:
-        {text[:2000]} 
-        """
-        # Note: We truncate to 2000 chars per chunk to fit context window efficiently
-        
-        try:
-            response = self.client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model="llama-3.3-70b-versatile",
-                temperature=0.0
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"Sanitization warning: {e}")
-            return text # Fail open (return text) or handle error
\ No newline at end of file
+        parts, last = [], 0
+        for start, end, tag in self.find_pii(text):
+            parts.append(text[last:start])
+            parts.append(tag)
+            last = end
+        parts.append(text[last:])
+        return "".join(parts)
@@ -1,74 +1,459 @@
-from supabase import create_client, Client
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from datetime import timedelta
 from app.core.config import settings
+from app.services.document_cache import document_cache
+from app.utils import doc_codec
+from app.core.logger import get_logger
 from datetime import datetime, timezone
 
+logger = get_logger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_supabase():
+    """
+    One Supabase client (and so one HTTP connection pool) per process, built on
+    first use. The SDK import alone is a noticeable share of cold-start time.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from supabase import create_client
+                _client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    return _client
+
+
 class SessionManager:
+    # The supabase client is blocking, so calls run in worker threads.
+    # Shared across instances so the cap holds per process, not per service.
+    _io_limit = asyncio.Semaphore(settings.DB_MAX_CONCURRENCY)
+    # session_id -> linked document_id for sessions we know exist, so saves
+    # don't re-select them every turn. Bounded; evicted ids just get re-checked.
+    _known_sessions = OrderedDict()
+    MAX_KNOWN_SESSIONS = 10000
+    _sessions_lock = threading.Lock()
+    # Flipped off if the sessions table has no summary/recent columns (older schema)
+    _memory_columns = True
+    # Flipped off if the documents table has no format_version/meta/blocks columns
+    _compact_columns = True
+    # Flipped off if the documents table has no content_hash column (uploads aren't deduplicated)
+    _hash_column = True
+    # Appended to an assistant message cut short (stream error or client disconnect);
+    # such turns stay in the log but are never read back as history
+    INTERRUPTED_MARK = " [response interrupted]"
+
     def __init__(self):
-        self.supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        self.doc_cache = document_cache
+
+    @property
+    def supabase(self):
+        return get_supabase()
+
+    @staticmethod
+    def _is_missing_column(error: Exception) -> bool:
+        # Postgres undefined_column, or PostgREST's schema-cache miss
+        text = str(error)
+        return "42703" in text or "PGRST204" in text
+
+    @classmethod
+    def _is_missing_hash_column(cls, error: Exception) -> bool:
+        return cls._is_missing_column(error) and "content_hash" in str(error)
+
+    def _compact(self) -> bool:
+        return SessionManager._compact_columns and settings.DOC_STORAGE_FORMAT >= doc_codec.CURRENT_FORMAT
+
+    def register_document(self, doc_id: str, filename: str, file_size: int, content: str = "",
+                          content_hash: str = None, pages: list = None):
+        """
+        Stores the extracted text compressed in clause-aligned blocks with its
+        meta (doc_codec format 2), or as plain `content` on an older schema.
+        """
+        row = {"id": doc_id, "filename": filename, "size_bytes": file_size}
+        if content_hash and SessionManager._hash_column:
+            row["content_hash"] = content_hash
+        try:
+            if self._compact():
+                meta, blocks = doc_codec.encode_document(content, content_hash, pages)
+                try:
+                    self._insert_document(
+                        {**row, "format_version": doc_codec.CURRENT_FORMAT, "meta": meta, "blocks": blocks}
+                    )
+                except Exception as e:
+                    if not self._is_missing_column(e):
+                        raise
+                    SessionManager._compact_columns = False
+                    logger.warning("documents table has no compact storage columns, storing plain text")
+            if not self._compact():
+                self._insert_document({**row, "content": content})
+            # Write-through: a fresh upload is usually chatted about right away
+            self.doc_cache.put(doc_id, {"filename": filename, "content": content})
+            return True
+        except Exception as e:
+            self.doc_cache.invalidate(doc_id)
+            logger.warning("Document register failed", extra={"doc_id": doc_id, "error": str(e)})
+            return False
+
+    def _insert_document(self, row: dict):
+        """Inserts a documents row, retrying without content_hash on a table that predates it."""
+        try:
+            self.supabase.table('documents').insert(row).execute()
+        except Exception as e:
+            if "content_hash" not in row or not self._is_missing_hash_column(e):
+                raise
+            self._no_hash_column()
+            self.supabase.table('documents').insert(
+                {k: v for k, v in row.items() if k != "content_hash"}
+            ).execute()
 
-    def register_document(self, doc_id: str, filename: str, file_size: int, content: str = ""):
+    @staticmethod
+    def _no_hash_column():
+        SessionManager._hash_column = False
+        logger.warning("documents table has no content_hash column, uploads won't be deduplicated")
+
+    def find_document_by_hash(self, content_hash: str):
+        if not SessionManager._hash_column:
+            return None
         try:
-            self.supabase.table('documents').insert({
-                "id": doc_id,
-                "filename": filename,
-                "size_bytes": file_size,
-                "content": content
-            }).execute()
+            res = self.supabase.table('documents').select('id').eq('content_hash', content_hash).limit(1).execute()
+            return res.data[0]['id'] if res.data else None
         except Exception as e:
-            print(f"⚠️ Doc Register Error: {e}")
+            if self._is_missing_hash_column(e):
+                self._no_hash_column()
+            else:
+                logger.warning("Hash lookup failed", extra={"error": str(e)})
+            return None
 
     # 🔴 UPDATED: Robust Fetching
     def get_document_data(self, doc_id: str):
+        # Strip whitespace just in case
+        clean_id = doc_id.strip()
+        data = self.get_documents_data([clean_id]).get(clean_id)
+        if data is None:
+            logger.warning("Document not found in DB", extra={"doc_id": clean_id})
+        return data
+
+    def _select_documents(self, columns: str, compact_columns: str, build_query):
+        """Runs `build_query(select)` with the compact storage columns, or without on an older schema."""
+        table = self.supabase.table('documents')
+        if SessionManager._compact_columns:
+            try:
+                return build_query(table.select(f"{columns}, {compact_columns}")).execute()
+            except Exception as e:
+                if not self._is_missing_column(e):
+                    raise
+                SessionManager._compact_columns = False
+                logger.warning("documents table has no compact storage columns, reading plain text")
+        return build_query(self.supabase.table('documents').select(columns)).execute()
+
+    @staticmethod
+    def _row_text(row: dict) -> str:
+        version = row.get('format_version') or doc_codec.LEGACY_FORMAT
+        if version == doc_codec.LEGACY_FORMAT:
+            return row.get('content') or ""
+        return doc_codec.decode_document(row.get('blocks') or [], version)
+
+    def get_documents_data(self, doc_ids: list):
+        """
+        Batched fetch: returns {doc_id: {"filename", "content"} | None}.
+        Cached documents cost nothing; all misses go out in one `id IN (...)` query.
+        Compact rows send their compressed blocks, not `meta`, and are inflated here.
+        """
+        clean_ids = list(dict.fromkeys(d.strip() for d in doc_ids if d and d.strip()))
+        found = {d_id: self.doc_cache.get(d_id) for d_id in clean_ids}
+        missing = [d_id for d_id, data in found.items() if data is None]
+        if missing:
+            try:
+                res = self._select_documents('id, filename, content', 'format_version, blocks',
+                                             lambda q: q.in_('id', missing))
+                for row in res.data or []:
+                    data = {"filename": row.get('filename'), "content": self._row_text(row)}
+                    self.doc_cache.put(row['id'], data)
+                    found[row['id']] = data
+            except Exception as e:
+                logger.error("Document fetch failed", extra={"doc_ids": missing, "error": str(e)})
+        return found
+
+    def get_document_meta(self, doc_id: str):
+        """
+        {"doc_id", "filename", "size_bytes", "format_version", "meta"} without
+        the document body, or None. Rows stored before format 2 have no meta:
+        theirs is computed from the text, which does mean downloading it
+        (None as well when that download fails).
+        """
+        clean_id = doc_id.strip()
         try:
-            # Strip whitespace just in case
-            clean_id = doc_id.strip()
-            res = self.supabase.table('documents').select('filename, content').eq('id', clean_id).execute()
-            if res.data and len(res.data) > 0:
-                return res.data[0]
-            else:
-                print(f"⚠️ Document not found in DB: {clean_id}")
-                return None
+            res = self._select_documents('id, filename, size_bytes', 'format_version, meta',
+                                         lambda q: q.eq('id', clean_id).limit(1))
         except Exception as e:
-            print(f"❌ Fetch Doc Error: {e}")
+            logger.error("Document meta fetch failed", extra={"doc_id": clean_id, "error": str(e)})
             return None
+        if not res.data:
+            return None
+        row = res.data[0]
+        version = row.get('format_version') or doc_codec.LEGACY_FORMAT
+        meta = row.get('meta')
+        if meta is None:
+            data = self.get_document_data(clean_id)
+            if data is None:
+                return None
+            meta = doc_codec.describe(data["content"])
+        return {"doc_id": clean_id, "filename": row.get('filename'), "size_bytes": row.get('size_bytes'),
+                "format_version": version, "meta": meta}
+
+    def get_document_clauses(self, doc_id: str, clause_ids: list, meta: dict = None):
+        """
+        {clause_id: text} for clauses numbered as in meta["clauses"]. On a
+        compact row only the blocks holding them are fetched. Pass the result
+        of get_document_meta as `meta` to save that lookup.
+        """
+        clean_id = doc_id.strip()
+        meta = meta or self.get_document_meta(clean_id)
+        if meta is None or meta["meta"] is None:
+            return {}
+        version, columns = meta["format_version"], meta["meta"]["clauses"]
+        data = self.doc_cache.get(clean_id)
+        if version == doc_codec.LEGACY_FORMAT or data is not None:
+            data = data or self.get_document_data(clean_id)
+            if data is None:
+                return {}
+            text = data["content"]
+            return {i: text[columns["start"][i]:columns["end"][i]]
+                    for i in clause_ids if 0 <= i < len(columns["start"])}
+
+        blocks = doc_codec.clause_blocks(meta["meta"], clause_ids)
+        if not blocks:
+            return {}
+        try:
+            # PostgREST JSON path per block: "b3:blocks->>3" returns just that element
+            res = self.supabase.table('documents').select(
+                ", ".join(f"b{n}:blocks->>{n}" for n in blocks)
+            ).eq('id', clean_id).limit(1).execute()
+        except Exception as e:
+            logger.error("Clause fetch failed", extra={"doc_id": clean_id, "error": str(e)})
+            return {}
+        if not res.data:
+            return {}
+        row = res.data[0]
+        return doc_codec.decode_clauses(meta["meta"], {n: row[f"b{n}"] for n in blocks}, clause_ids, version)
+
+    def invalidate_document(self, doc_id: str):
+        self.doc_cache.invalidate(doc_id.strip())
 
     def get_document_content(self, doc_id: str):
         data = self.get_document_data(doc_id)
         return data['content'] if data else ""
 
+    def _remember_session(self, session_id: str, doc_id: str = None):
+        with self._sessions_lock:
+            self._known_sessions[session_id] = doc_id
+            self._known_sessions.move_to_end(session_id)
+            while len(self._known_sessions) > self.MAX_KNOWN_SESSIONS:
+                self._known_sessions.popitem(last=False)
+
+    def _is_known_session(self, session_id: str, doc_id: str = None) -> bool:
+        with self._sessions_lock:
+            if session_id not in self._known_sessions:
+                return False
+            return doc_id is None or self._known_sessions[session_id] == doc_id
+
+    @staticmethod
+    def _link_doc(doc_id: str = None):
+        """Primary document a session should point to, or None for general chat."""
+        # Safe split for primary ID
+        primary_doc_id = doc_id.split(",")[0].strip() if doc_id else None
+        if primary_doc_id in [None, "", "general", "general_chat"]:
+            return None
+        return primary_doc_id
+
     def _ensure_session(self, session_id: str, doc_id: str = None):
         try:
-            # Safe split for primary ID
-            primary_doc_id = doc_id
-            if doc_id and "," in doc_id:
-                primary_doc_id = doc_id.split(",")[0].strip()
+            primary_doc_id = self._link_doc(doc_id)
+            if self._is_known_session(session_id, primary_doc_id):
+                return
 
             res = self.supabase.table('sessions').select('*').eq('id', session_id).execute()
             
             if not res.data:
                 data = {"id": session_id}
-                if primary_doc_id and primary_doc_id not in ["general", "general_chat"]:
+                if primary_doc_id:
                     data["document_id"] = primary_doc_id
                 self.supabase.table('sessions').insert(data).execute()
+                self._remember_session(session_id, primary_doc_id)
             else:
                 existing_doc = res.data[0].get('document_id')
-                if primary_doc_id and primary_doc_id not in ["general", "general_chat"] and existing_doc != primary_doc_id:
+                if primary_doc_id and existing_doc != primary_doc_id:
                     self.supabase.table('sessions').update({"document_id": primary_doc_id}).eq('id', session_id).execute()
+                    existing_doc = primary_doc_id
+                self._remember_session(session_id, existing_doc)
+        except Exception as e:
+            logger.error("Session upsert failed", extra={"session_id": session_id, "error": str(e)})
+
+    @property
+    def has_memory_columns(self) -> bool:
+        return SessionManager._memory_columns
+
+    def get_memory(self, session_id: str):
+        """
+        Rolling conversation memory kept on the sessions row: {"summary", "recent"}.
+        `recent` is None when the row predates the memory columns (or they
+        don't exist yet, or the read failed): callers use get_history then.
+        """
+        return self.get_memories([session_id])[session_id]
+
+    def get_memories(self, session_ids: list):
+        """Batched get_memory: {session_id: {"summary", "recent"}} in one `id IN (...)` read."""
+        fallback = {s: {"summary": "", "recent": None} for s in session_ids}
+        if not SessionManager._memory_columns or not session_ids:
+            return fallback
+        try:
+            res = self.supabase.table('sessions').select('id, summary, recent').in_('id', list(session_ids)).execute()
         except Exception as e:
-            print(f"Session Error: {e}")
+            if self._is_missing_column(e):
+                # Older schema: stop asking, use messages from now on
+                SessionManager._memory_columns = False
+                logger.warning("sessions table has no summary/recent columns, using message history")
+            else:
+                # Transient: this turn falls back to the messages table, the next one retries
+                logger.warning("Session memory read failed", extra={"session_ids": session_ids, "error": str(e)})
+            return fallback
+        # New sessions have no row yet: nothing said so far
+        memories = {s: {"summary": "", "recent": []} for s in session_ids}
+        for row in res.data or []:
+            recent = row.get('recent')
+            if isinstance(recent, str):
+                recent = json.loads(recent)
+            memories[row['id']] = {"summary": row.get('summary') or "", "recent": recent}
+        return memories
+
+    def save_memories(self, memories: dict):
+        """
+        {session_id: {"summary", "recent"}} in one upsert (the sessions rows
+        already exist: TurnWriter wrote them). Raises so the caller can log.
+        """
+        if not SessionManager._memory_columns or not memories:
+            return
+        rows = [{"id": s, "summary": m["summary"], "recent": m["recent"]} for s, m in memories.items()]
+        self.supabase.table('sessions').upsert(rows, on_conflict='id').execute()
 
     def get_history(self, session_id: str):
         try:
             res = self.supabase.table('messages').select('role, content').eq('session_id', session_id).order('created_at', desc=True).limit(6).execute()
-            return res.data[::-1] if res.data else []
+            return self._drop_interrupted(res.data[::-1] if res.data else [])
         except: return []
 
+    @classmethod
+    def _drop_interrupted(cls, messages: list):
+        """Removes interrupted assistant messages together with the question they answered."""
+        kept = []
+        for msg in messages:
+            if msg["role"] == "assistant" and msg["content"].endswith(cls.INTERRUPTED_MARK):
+                if kept and kept[-1]["role"] == "user":
+                    kept.pop()
+                continue
+            kept.append(msg)
+        return kept
+
     def save_turn(self, session_id: str, doc_id: str, user_msg: str, ai_msg: str):
         try:
             self._ensure_session(session_id, doc_id)
-            self.supabase.table('messages').insert([
-                {"session_id": session_id, "role": "user", "content": user_msg},
-                {"session_id": session_id, "role": "assistant", "content": ai_msg}
-            ]).execute()
+            self.supabase.table('messages').insert(self.turn_rows(session_id, user_msg, ai_msg)).execute()
         except Exception as e:
-            print(f"Save Turn Error: {e}")
\ No newline at end of file
+            logger.error("Save turn failed", extra={"session_id": session_id, "error": str(e)})
+
+    @classmethod
+    def turn_rows(cls, session_id: str, user_msg: str, ai_msg: str, interrupted: bool = False):
+        """
+        Message rows for one turn. Timestamps are set client-side so turns that
+        are flushed together in one batch still sort in the order they happened.
+        """
+        if interrupted:
+            ai_msg += cls.INTERRUPTED_MARK
+        now = datetime.now(timezone.utc)
+        return [
+            {"session_id": session_id, "role": "user", "content": user_msg,
+             "created_at": now.isoformat()},
+            {"session_id": session_id, "role": "assistant", "content": ai_msg,
+             "created_at": (now + timedelta(microseconds=1)).isoformat()}
+        ]
+
+    def save_turns_batch(self, sessions: dict, messages: list):
+        """
+        Bulk write for the background TurnWriter: one upsert per kind of session
+        row, then one insert for all messages. Raises so the caller can retry.
+        `sessions` maps session_id -> doc_id (comma-separated ids allowed).
+        """
+        linked, bare = [], []
+        for session_id, doc_id in sessions.items():
+            primary_doc_id = self._link_doc(doc_id)
+            if self._is_known_session(session_id, primary_doc_id):
+                continue
+            if primary_doc_id:
+                linked.append({"id": session_id, "document_id": primary_doc_id})
+            else:
+                bare.append({"id": session_id})
+
+        if linked:
+            self.supabase.table('sessions').upsert(linked, on_conflict='id').execute()
+        if bare:
+            # Never clobber an existing document link with a general-chat turn
+            self.supabase.table('sessions').upsert(bare, on_conflict='id', ignore_duplicates=True).execute()
+        if messages:
+            self.supabase.table('messages').insert(messages).execute()
+
+        for row in linked:
+            self._remember_session(row["id"], row["document_id"])
+        for row in bare:
+            if not self._is_known_session(row["id"]):
+                self._remember_session(row["id"])
+
+    # --- ASYNC WRAPPERS (keep Supabase I/O off the event loop) ---
+    async def _run(self, fn, *args):
+        async with self._io_limit:
+            return await asyncio.to_thread(fn, *args)
+
+    async def get_history_async(self, session_id: str):
+        return await self._run(self.get_history, session_id)
+
+    async def get_memory_async(self, session_id: str):
+        return await self._run(self.get_memory, session_id)
+
+    async def get_memories_async(self, session_ids: list):
+        return await self._run(self.get_memories, session_ids)
+
+    async def save_memories_async(self, memories: dict):
+        return await self._run(self.save_memories, memories)
+
+    async def get_document_data_async(self, doc_id: str):
+        return await self._run(self.get_document_data, doc_id)
+
+    async def get_documents_data_async(self, doc_ids: list):
+        # Fully cached turns never leave the event loop
+        cached = {d.strip(): self.doc_cache.get(d.strip()) for d in doc_ids if d and d.strip()}
+        if cached and all(data is not None for data in cached.values()):
+            return cached
+        return await self._run(self.get_documents_data, doc_ids)
+
+    async def register_document_async(self, doc_id: str, filename: str, file_size: int, content: str = "",
+                                      content_hash: str = None, pages: list = None):
+        return await self._run(self.register_document, doc_id, filename, file_size, content, content_hash, pages)
+
+    async def get_document_meta_async(self, doc_id: str):
+        return await self._run(self.get_document_meta, doc_id)
+
+    async def get_document_clauses_async(self, doc_id: str, clause_ids: list, meta: dict = None):
+        return await self._run(self.get_document_clauses, doc_id, clause_ids, meta)
+
+    async def find_document_by_hash_async(self, content_hash: str):
+        return await self._run(self.find_document_by_hash, content_hash)
+
+    async def save_turn_async(self, session_id: str, doc_id: str, user_msg: str, ai_msg: str):
+        return await self._run(self.save_turn, session_id, doc_id, user_msg, ai_msg)
+
+    async def save_turns_batch_async(self, sessions: dict, messages: list):
+        return await self._run(self.save_turns_batch, sessions, messages)
@@ -0,0 +1,178 @@
+import asyncio
+from collections import OrderedDict
+from app.core.config import settings
+from app.services.provider_gateway import get_gateway, GROQ, GROQ_FALLBACK
+from app.core.logger import get_logger
+from app.core.metrics import span, PROMPT_TOKENS
+from app.utils.token_counter import count_message_tokens
+
+logger = get_logger(__name__)
+
+# The small model is plenty for summarising, and keeps this off the 70B quota
+SUMMARY_PROVIDERS = [GROQ_FALLBACK, GROQ]
+
+SUMMARY_PROMPT = (
+    "You maintain the running summary of a chat between a user and a legal advisor AI. "
+    "Update the summary with the new messages. Keep facts, figures, dates, parties, "
+    "clause references and any advice already given; drop pleasantries. "
+    "Reply with the updated summary only, at most {words} words."
+)
+
+
+class SessionMemory:
+    """
+    Conversation memory per session: a rolling summary of everything older plus
+    the last HISTORY_TAIL_MESSAGES messages verbatim, both stored on the
+    sessions row. A turn reads it with one primary-key lookup, and prompt cost
+    stays flat however long the session runs.
+
+    After TurnWriter has saved a batch, `schedule` applies the whole batch in
+    the background: new messages are appended to each session's tail and every
+    changed row goes out in a single upsert. Sessions with SUMMARY_FOLD_MESSAGES
+    past the tail then get them folded into the summary (one LLM call each, run
+    concurrently and outside the lock), and the folded rows are written again.
+    Until a fold lands the tail simply keeps the older messages too, so the
+    next turn always sees the newest exchange. The latest memory per session is
+    also kept in process, so neither chat turns nor updates read it back from
+    Supabase once seen.
+    """
+    MAX_SESSIONS = 10000
+
+    def __init__(self, mgr, gateway=None, tail: int = None, fold: int = None):
+        self.mgr = mgr
+        self.gateway = gateway
+        self.tail = tail if tail is not None else settings.HISTORY_TAIL_MESSAGES
+        self.fold = fold if fold is not None else settings.SUMMARY_FOLD_MESSAGES
+        self._state = OrderedDict()  # session_id -> {"summary", "recent"}, newest as written
+        self._lock = asyncio.Lock()  # state changes and their writes apply one at a time, in order
+        self._folding = set()  # sessions with a summary fold in flight
+        self._tasks = set()
+
+    def _remember(self, session_id: str, memory: dict):
+        self._state[session_id] = memory
+        self._state.move_to_end(session_id)
+        while len(self._state) > self.MAX_SESSIONS:
+            self._state.popitem(last=False)
+
+    async def load(self, session_id: str):
+        """Returns (summary, recent messages oldest first)."""
+        memory = self._state.get(session_id)
+        if memory is not None:
+            self._state.move_to_end(session_id)
+            return memory["summary"], memory["recent"]
+        memory = await self.mgr.get_memory_async(session_id)
+        if memory["recent"] is None:
+            # Session from before rolling memory: its last messages stand in until the first update
+            return memory["summary"], await self.mgr.get_history_async(session_id)
+        if session_id not in self._state:  # a batch may have applied newer state meanwhile
+            self._remember(session_id, memory)
+        return memory["summary"], memory["recent"]
+
+    def schedule(self, turns: dict):
+        """`turns` maps session_id -> message rows just saved, oldest first. Returns immediately."""
+        if not turns:
+            return
+        task = asyncio.create_task(self._apply(turns))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def stop(self):
+        """Waits for in-flight updates (app shutdown)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _apply(self, turns: dict):
+        if not self.mgr.has_memory_columns:
+            return
+        folds = {}
+        try:
+            async with self._lock:
+                folds = await self._append(turns)
+            if folds:
+                summaries = await asyncio.gather(*(self._summarize(summary, older) for summary, older in folds.values()))
+                async with self._lock:
+                    await self._fold_in({s: (summary, len(folds[s][1])) for s, summary in zip(folds, summaries)})
+        except Exception as e:
+            # The messages table still has the full log, and the in-process state
+            # is written again with the session's next batch
+            logger.warning("Session memory update failed", extra={"sessions": len(turns), "error": str(e)})
+        finally:
+            self._folding.difference_update(folds)
+
+    async def _append(self, turns: dict) -> dict:
+        """
+        Appends the batch to each session's tail, serves and saves the result,
+        and returns {session_id: (summary, older messages)} for the sessions
+        now due a fold (and not already folding).
+        """
+        # 1. Current memory: in process, else one batched read for the sessions not seen yet
+        current = {s: self._state[s] for s in turns if s in self._state}
+        missing = [s for s in turns if s not in current]
+        from_history = set()
+        if missing:
+            for s, memory in (await self.mgr.get_memories_async(missing)).items():
+                if memory["recent"] is None:
+                    # Older session: the messages table already holds the new rows too
+                    memory = {"summary": memory["summary"], "recent": await self.mgr.get_history_async(s)}
+                    from_history.add(s)
+                current[s] = memory
+
+        # 2. Append, trim, and pick out the sessions due a fold
+        limit = settings.RECENT_MESSAGE_CHARS
+        updated, folds = {}, {}
+        for s, rows in turns.items():
+            summary, recent = current[s]["summary"], current[s]["recent"]
+            if s not in from_history:
+                recent = recent + [{"role": r["role"], "content": r["content"]} for r in rows]
+            recent = [{"role": m["role"], "content": m["content"][:limit]} for m in recent]
+            if len(recent) >= self.tail + self.fold and s not in self._folding:
+                folds[s] = (summary, recent[:-self.tail])
+                self._folding.add(s)
+            updated[s] = {"summary": summary, "recent": recent}
+
+        # 3. Newest state is served from process right away; one upsert persists the batch
+        for s, memory in updated.items():
+            self._remember(s, memory)
+        await self.mgr.save_memories_async(updated)
+        return folds
+
+    async def _fold_in(self, folded: dict):
+        """`folded` maps session_id -> (new summary, number of messages it covers)."""
+        updated = {}
+        for s, (summary, count) in folded.items():
+            memory = self._state.get(s)
+            if memory is None:
+                # Evicted meanwhile: the row holds the tail as last written
+                memory = (await self.mgr.get_memories_async([s]))[s]
+                if memory["recent"] is None:
+                    continue
+            # Later batches only appended, so the folded messages are still the head of the tail
+            updated[s] = {"summary": summary, "recent": memory["recent"][count:]}
+            self._remember(s, updated[s])
+        await self.mgr.save_memories_async(updated)
+
+    async def _summarize(self, summary: str, messages: list) -> str:
+        lines = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = [
+            {"role": "system", "content": SUMMARY_PROMPT.format(words=settings.SUMMARY_MAX_TOKENS * 3 // 4)},
+            {"role": "user", "content": f"CURRENT SUMMARY:\n{summary or '(none)'}\n\nNEW MESSAGES:\n{lines}"},
+        ]
+        PROMPT_TOKENS.observe(count_message_tokens(prompt), kind="summary")
+        try:
+            gateway = self.gateway or get_gateway()
+            with span("memory.summarize"):
+                updated = await gateway.complete(
+                    prompt, order=SUMMARY_PROVIDERS, max_tokens=settings.SUMMARY_MAX_TOKENS, temperature=0.0
+                )
+            return updated.strip() or summary
+        except Exception as e:
+            logger.warning("Summary LLM failed, keeping an extractive summary", extra={"error": str(e)})
+            return self._extractive(summary, messages)
+
+    @staticmethod
+    def _extractive(summary: str, messages: list) -> str:
+        """No-LLM fallback: first sentence-ish of each message, newest kept when over the cap."""
+        notes = [f"{m['role']}: {' '.join(m['content'].split())[:200]}" for m in messages]
+        text = "\n".join(p for p in [summary] + notes if p)
+        cap = settings.SUMMARY_MAX_TOKENS * 4  # ~4 chars per token
+        return text if len(text) <= cap else "…" + text[-cap:]
@@ -0,0 +1,136 @@
+import asyncio
+from app.core.config import settings
+from app.services.session_manager import SessionManager
+from app.core.logger import get_logger
+from app.core.metrics import span
+
+logger = get_logger(__name__)
+
+
+class TurnWriter:
+    """
+    Write-behind persistence for chat turns. `enqueue` returns immediately; a
+    background task drains the queue every TURN_FLUSH_INTERVAL_MS (or sooner
+    once TURN_BATCH_SIZE turns are waiting) and writes the whole batch with
+    SessionManager.save_turns_batch. Failed batches are retried with exponential
+    backoff (0.5s, 1s, 2s, 4s by default) so the attempts span a short outage
+    instead of being spent within milliseconds of it.
+    """
+    MAX_ATTEMPTS = 5
+    MAX_BACKOFF = 8.0
+
+    def __init__(self, mgr: SessionManager, batch_size: int = None, flush_interval: float = None, on_saved=None):
+        self.mgr = mgr
+        # Called with {session_id: [message rows]} after each successful batch (e.g. SessionMemory.schedule)
+        self.on_saved = on_saved
+        self.batch_size = batch_size or settings.TURN_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else settings.TURN_FLUSH_INTERVAL_MS / 1000
+        self._queue = None
+        self._task = None
+        self._in_flight = 0
+        self._failures = 0  # consecutive failed flushes, for the backoff
+
+    @property
+    def queue_depth(self) -> int:
+        """Turns accepted but not yet written (queued + in the batch being flushed)."""
+        return (self._queue.qsize() if self._queue else 0) + self._in_flight
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, session_id: str, doc_id: str, user_msg: str, ai_msg: str, interrupted: bool = False):
+        """
+        `interrupted` marks a partial answer: it is logged like any turn but
+        not handed to on_saved, so it never reaches session memory.
+        """
+        # Lazily start so callers outside the app lifespan (scripts, tests) still persist
+        self.start()
+        rows = self.mgr.turn_rows(session_id, user_msg, ai_msg, interrupted)
+        self._queue.put_nowait((session_id, doc_id, rows, interrupted, 0))
+
+    async def stop(self):
+        """Flush everything still queued, then stop the background task."""
+        if self._task is None:
+            return
+        # Sentinel instead of task.cancel(): the writer finishes its current batch cleanly
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+        # Anything requeued for retry by the final flush gets its last chances here
+        while not self._queue.empty():
+            batch, _ = self._drain(self._queue.qsize())
+            await self._flush(batch)
+
+    def _drain(self, limit: int):
+        """Non-blocking take of up to `limit` turns. Returns (batch, saw_stop_sentinel)."""
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            # Coalesce whatever else arrives within the flush window
+            while len(batch) < self.batch_size and not stopping:
+                more, stopping = self._drain(self.batch_size - len(batch))
+                batch.extend(more)
+                remaining = deadline - loop.time()
+                if stopping or len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        if not batch:
+            return
+        sessions, messages = {}, []
+        for session_id, doc_id, rows, _, _ in batch:
+            sessions[session_id] = doc_id  # latest doc link for the session wins
+            messages.extend(rows)
+
+        self._in_flight += len(batch)
+        try:
+            with span("turns.save_batch"):
+                await self.mgr.save_turns_batch_async(sessions, messages)
+            if self.on_saved:
+                saved = {}
+                for session_id, _, rows, interrupted, _ in batch:
+                    if not interrupted:
+                        saved.setdefault(session_id, []).extend(rows)
+                if saved:
+                    self.on_saved(saved)
+            self._failures = 0
+        except Exception as e:
+            self._failures += 1
+            retry = [(s, d, r, i, attempt + 1) for s, d, r, i, attempt in batch if attempt + 1 < self.MAX_ATTEMPTS]
+            delay = min(self.MAX_BACKOFF, settings.TURN_RETRY_BACKOFF_MS / 1000 * 2 ** (self._failures - 1))
+            logger.warning("Turn flush failed", extra={
+                "turns": len(batch), "requeued": len(retry), "retry_in": delay, "error": str(e)
+            })
+            # Waiting here holds back the next flush too: it would only hit the same outage.
+            # New turns keep queueing meanwhile and go out together once the database is back.
+            if retry:
+                await asyncio.sleep(delay)
+            for item in retry:
+                self._queue.put_nowait(item)
+        finally:
+            self._in_flight -= len(batch)
@@ -1,83 +1,255 @@
-from pinecone import Pinecone, ServerlessSpec
-from app.core.config import settings
-import google.generativeai as genai
+import json
+import os
+import re
+import threading
 import time
-#removed pine cone for now as i am focusing <50 page contract .
+from collections import OrderedDict
+import numpy as np
+from app.core.config import settings
+from app.services.embedder import get_embedder, embedder_name
+from app.core.logger import get_logger
+# Embedded vector index: replaces Pinecone + Gemini embeddings. Everything is
+# in-process and on local disk, so a write is searchable as soon as it returns.
+
+logger = get_logger(__name__)
+
+
+class HyperplaneLSH:
+    """Random-hyperplane LSH for cosine similarity: `tables` hash tables of `bits` bits each."""
+
+    def __init__(self, dim: int, tables: int = 4, bits: int = 12, seed: int = 7):
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((tables * bits, dim)).astype(np.float32)
+        self.tables, self.bits = tables, bits
+        self._powers = (1 << np.arange(bits)).astype(np.int64)
+
+    def codes(self, matrix: np.ndarray) -> np.ndarray:
+        """(n, dim) -> (n, tables) bucket codes."""
+        signs = (matrix @ self.planes.T > 0).reshape(len(matrix), self.tables, self.bits)
+        return signs @ self._powers
+
+    def probes(self, code: int):
+        """The bucket itself plus every bucket one bit away (multi-probe)."""
+        yield code
+        for b in range(self.bits):
+            yield code ^ (1 << b)
+
+
+class DocVectors:
+    """All vectors of one document: row-aligned ids/metadata and a float32 matrix."""
+    EXACT_SEARCH_MAX = 2048  # Below this a brute-force dot product beats the LSH lookup
+
+    def __init__(self, doc_id: str, embedder: str, records: list, matrix: np.ndarray):
+        self.doc_id = doc_id
+        self.embedder = embedder
+        self.records = records
+        self.matrix = matrix
+        self._buckets = None
+        self._lsh = None
+
+    def _build_buckets(self, lsh: HyperplaneLSH):
+        buckets = [dict() for _ in range(lsh.tables)]
+        for row, codes in enumerate(lsh.codes(self.matrix).tolist()):
+            for t, code in enumerate(codes):
+                buckets[t].setdefault(code, []).append(row)
+        self._buckets, self._lsh = buckets, lsh
+
+    def search(self, query: np.ndarray, top_k: int, lsh: HyperplaneLSH):
+        n = len(self.records)
+        if n == 0:
+            return []
+        rows = None
+        if n > self.EXACT_SEARCH_MAX:
+            if self._lsh is not lsh:
+                self._build_buckets(lsh)
+            found = set()
+            for t, code in enumerate(lsh.codes(query[None, :])[0].tolist()):
+                for probe in lsh.probes(code):
+                    found.update(self._buckets[t].get(probe, ()))
+            if len(found) >= top_k:
+                rows = np.fromiter(found, dtype=np.int64, count=len(found))
+        if rows is None:
+            scores = self.matrix @ query
+            rows = np.arange(n)
+        else:
+            scores = self.matrix[rows] @ query
+        k = min(top_k, len(rows))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(float(scores[i]), self.records[int(rows[i])]) for i in best]
+
+
 class VectorStore:
-    def __init__(self):
-        genai.configure(api_key=settings.GOOGLE_API_KEY)
-        self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-        self.index_name = "legal-advisor-index"
-        self.index = None 
-
-    def _ensure_index_ready(self):
-        if self.index: return self.index
+    """
+    One directory per document under VECTOR_INDEX_DIR:
+      meta.json       embedder name, dim, generation and one record per row
+      vectors-<g>.f32 raw float32 matrix, memory-mapped on load
+    A write produces a new generation file and then swaps meta.json atomically,
+    so readers (including other workers) never see a half-written matrix, and
+    the in-process copy is updated before `upsert` returns (read-your-writes).
+    The embedder is built on first embed/search, so constructing the store
+    (at import time, via ingestion_pipeline) never loads a model.
+    """
+    MAX_LOADED = 64
+
+    def __init__(self, root: str = None, embedder=None):
+        self.root = root or settings.VECTOR_INDEX_DIR
+        self._embedder = embedder
+        self._lsh = None
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._init_lock = threading.Lock()
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            with self._init_lock:
+                if self._embedder is None:
+                    self._embedder = get_embedder()
+        return self._embedder
+
+    @property
+    def embedder_name(self) -> str:
+        # Status checks compare stored vectors against this: no need to load the model for it
+        return self._embedder.name if self._embedder is not None else embedder_name()
+
+    @property
+    def lsh(self) -> HyperplaneLSH:
+        if self._lsh is None:
+            self._lsh = HyperplaneLSH(self.embedder.dim)
+        return self._lsh
+
+    def _dir(self, doc_id: str) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9_\-]", "_", doc_id))
+
+    def _remember(self, doc: DocVectors):
+        with self._lock:
+            self._loaded[doc.doc_id] = doc
+            self._loaded.move_to_end(doc.doc_id)
+            while len(self._loaded) > self.MAX_LOADED:
+                self._loaded.popitem(last=False)
+
+    def _load(self, doc_id: str):
         try:
-            existing = [i.name for i in self.pc.list_indexes()]
-            if self.index_name not in existing:
-                self.pc.create_index(
-                    name=self.index_name,
-                    dimension=768, 
-                    metric="cosine", 
-                    spec=ServerlessSpec(cloud="aws", region="us-east-1")
-                )
-                time.sleep(5) 
-            self.index = self.pc.Index(self.index_name)
-            return self.index
-        except Exception as e:
-            print(f"⚠️ Pinecone Connect Error: {e}")
-            raise e
-
-    def get_embedding(self, text: str):
+            with open(os.path.join(self._dir(doc_id), "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("embedder") != self.embedder_name:
+            logger.warning("Stale embedder, re-ingest to search this document",
+                           extra={"doc_id": doc_id, "embedder": meta.get("embedder")})
+            return None
+        records = meta["records"]
+        if not records:
+            return DocVectors(doc_id, meta["embedder"], [], np.zeros((0, meta["dim"]), dtype=np.float32))
+        path = os.path.join(self._dir(doc_id), f"vectors-{meta['generation']}.f32")
+        matrix = np.memmap(path, dtype=np.float32, mode="r", shape=(len(records), meta["dim"]))
+        return DocVectors(doc_id, meta["embedder"], records, matrix)
+
+    def _get(self, doc_id: str):
+        with self._lock:
+            doc = self._loaded.get(doc_id)
+            if doc:
+                self._loaded.move_to_end(doc_id)
+                return doc
+        doc = self._load(doc_id)
+        if doc:
+            self._remember(doc)
+        return doc
+
+    def _write(self, doc_id: str, records: list, matrix: np.ndarray):
+        folder = self._dir(doc_id)
+        os.makedirs(folder, exist_ok=True)
+        generation = time.time_ns()
+        path = os.path.join(folder, f"vectors-{generation}.f32")
+        matrix.tofile(path)
+        meta = {"embedder": self.embedder.name, "dim": self.embedder.dim,
+                "generation": generation, "records": records}
+        tmp = os.path.join(folder, "meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, separators=(",", ":"))
+        os.replace(tmp, os.path.join(folder, "meta.json"))
+        # Old generations can still be mapped by a reader; best-effort cleanup
+        for name in os.listdir(folder):
+            if name.startswith("vectors-") and name != f"vectors-{generation}.f32":
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError:
+                    pass
+
+    def upsert(self, doc_id: str, records: list, vectors: np.ndarray = None, replace: bool = False):
+        """
+        `records` are dicts with an "id" and "text" (plus any metadata). Rows with
+        an existing id are replaced; `replace=True` drops every other row of the
+        document too. Vectors are computed from "text" unless given.
+        """
+        if vectors is None:
+            vectors = self.embedder.embed([r["text"] for r in records])
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) != len(records):
+            raise ValueError(f"{len(records)} records but {len(vectors)} vectors")
+        with self._write_lock:
+            current = None if replace else self._get(doc_id)
+            merged, rows = {}, []
+            if current:
+                for i, rec in enumerate(current.records):
+                    merged[rec["id"]] = len(rows)
+                    rows.append((rec, current.matrix[i]))
+            for rec, vec in zip(records, vectors):
+                rec = {**rec, "doc_id": doc_id}
+                if rec["id"] in merged:
+                    rows[merged[rec["id"]]] = (rec, vec)
+                else:
+                    merged[rec["id"]] = len(rows)
+                    rows.append((rec, vec))
+            all_records = [r for r, _ in rows]
+            matrix = np.array([v for _, v in rows], dtype=np.float32).reshape(len(rows), self.embedder.dim)
+            self._write(doc_id, all_records, matrix)
+            self._remember(DocVectors(doc_id, self.embedder.name, all_records, matrix))
+
+    def has_doc(self, doc_id: str) -> bool:
+        return self._get(doc_id) is not None
+
+    def delete_doc(self, doc_id: str):
+        with self._write_lock:
+            with self._lock:
+                self._loaded.pop(doc_id, None)
+            folder = self._dir(doc_id)
+            if os.path.isdir(folder):
+                for name in os.listdir(folder):
+                    try:
+                        os.remove(os.path.join(folder, name))
+                    except OSError:
+                        pass
+                try:
+                    os.rmdir(folder)
+                except OSError:
+                    pass
+
+    def _all_doc_ids(self):
         try:
-            return genai.embed_content(
-                model="models/text-embedding-004",
-                content=text.replace("\n", " "),
-                task_type="retrieval_document"
-            )['embedding']
-        except: return []
-
-    def add_doc(self, doc_id: str, text: str, metadata: dict):
-        index = self._ensure_index_ready()
-        vector = self.get_embedding(text)
-        if vector:
-            # Use millisecond timestamp to ensure unique ID for every chunk
-            index.upsert(vectors=[{
-                "id": f"{doc_id}_{int(time.time()*1000)}", 
-                "values": vector, 
-                "metadata": {**metadata, "text": text[:2000], "doc_id": doc_id} 
-            }])
+            return [d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d))]
+        except OSError:
+            return []
 
     def search(self, query: str, doc_id: str = None, top_k: int = 5):
-        """Robust Search with Retry Loop to handle Index Lag"""
-        index = self._ensure_index_ready()
-        query_vector = genai.embed_content(
-            model="models/text-embedding-004",
-            content=query,
-            task_type="retrieval_query"
-        )['embedding']
-        
-        filter_dict = {"doc_id": {"$eq": doc_id}} if doc_id and doc_id not in ["general", "general_chat"] else None
-        
-        # RETRY LOOP: Wait up to 10 seconds for data to appear
-        max_retries = 5
-        for attempt in range(max_retries):
-            results = index.query(
-                vector=query_vector,
-                top_k=top_k,
-                include_metadata=True,
-                filter=filter_dict 
-            )
-            
-            # Handle response safely (Pinecone returns Objects, not just Dicts)
-            matches = getattr(results, 'matches', []) or results.get('matches', [])
-            
-            # If we found data OR we aren't filtering for a specific file, return immediately
-            if matches or not filter_dict:
-                return results
-            
-            # If we are looking for a specific file but found nothing, wait and try again
-            print(f"⏳ Indexing lag... Retry {attempt+1}/{max_retries} for doc_id: {doc_id}")
-            time.sleep(2) 
-            
-        return results
\ No newline at end of file
+        """
+        Cosine search, filtered to `doc_id` (comma-separated ids allowed) or
+        across every document for "general" chats. Pinecone-shaped result.
+        """
+        if doc_id and doc_id not in ["general", "general_chat"]:
+            doc_ids = [d.strip() for d in doc_id.split(",") if d.strip()]
+        else:
+            doc_ids = self._all_doc_ids()
+        query_vector = self.embedder.embed([query])[0]
+
+        hits = []
+        for d_id in doc_ids:
+            doc = self._get(d_id)
+            if doc:
+                hits.extend(doc.search(query_vector, top_k, self.lsh))
+        hits.sort(key=lambda h: -h[0])
+        return {"matches": [
+            {"id": rec["id"], "score": score, "metadata": rec} for score, rec in hits[:top_k]
+        ]}
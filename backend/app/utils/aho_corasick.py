@@ -0,0 +1,61 @@
+from collections import deque
+
+
+class Automaton:
+    """
+    Minimal Aho-Corasick automaton: add keywords, build once, then find every
+    occurrence of every keyword in a single left-to-right pass over the text.
+    Matching is exact; callers lowercase both sides for case-insensitive use.
+    """
+
+    def __init__(self):
+        self._goto = [{}]   # state -> {char: next_state}
+        self._fail = [0]
+        self._out = [[]]    # state -> [(keyword_length, value)]
+        self._built = False
+
+    def add(self, keyword: str, value=None):
+        if not keyword:
+            return
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(keyword), keyword if value is None else value))
+        self._built = False
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+        return self
+
+    def iter(self, text: str):
+        """Yields (start, end, value) for every match, in order of end position."""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0  # the root is never a child, so 0 means "no transition"
+            if out[state]:
+                for length, value in out[state]:
+                    yield i + 1 - length, i + 1, value
@@ -0,0 +1,80 @@
+import re
+
+# Lines that open a new clause/section in typical contracts:
+#   "1.", "1.2", "12.3.4)", "(a)", "Section 4", "ARTICLE IV", "Clause 7", "SCHEDULE A"
+NUMBERED_RE = re.compile(
+    r"^\s*(?:(?:section|article|clause|schedule|annexure|annex|exhibit|appendix)\s+[\w.\-]+"
+    r"|\d{1,3}(?:\.\d{1,3})*[.)]?\s+\S|\([a-z0-9]{1,4}\)\s+\S)",
+    re.IGNORECASE,
+)
+# ...plus short ALL-CAPS headings such as "TERMINATION" or "GOVERNING LAW"
+CAPS_HEADING_RE = re.compile(r"^[A-Z][A-Z0-9 ,&'\-]{3,60}$")
+
+MIN_CLAUSE_CHARS = 200    # Tiny fragments get merged into the previous clause
+MAX_CLAUSE_CHARS = 2500   # Oversized sections get split on paragraph/sentence breaks
+
+
+def _is_heading(line: str) -> bool:
+    stripped = line.strip()
+    if not stripped or len(stripped) > 120:
+        return False
+    return bool(NUMBERED_RE.match(stripped) or CAPS_HEADING_RE.match(stripped))
+
+
+def _split_long(start: int, end: int, text: str):
+    """Breaks [start, end) into pieces <= MAX_CLAUSE_CHARS on the best available boundary."""
+    pieces = []
+    while end - start > MAX_CLAUSE_CHARS:
+        window = text[start:start + MAX_CLAUSE_CHARS]
+        cut = window.rfind("\n\n")
+        if cut < MAX_CLAUSE_CHARS // 3:
+            cut = window.rfind(". ")
+            cut = cut + 1 if cut >= 0 else -1
+        if cut < MAX_CLAUSE_CHARS // 3:
+            cut = MAX_CLAUSE_CHARS
+        pieces.append((start, start + cut))
+        start += cut
+    pieces.append((start, end))
+    return pieces
+
+
+def split_clauses(text: str):
+    """
+    Splits a contract into clause-sized spans.
+    Returns a list of {"heading", "start", "end"} dicts; offsets index into `text`
+    so callers can slice the original without storing a second copy.
+    """
+    if not text:
+        return []
+
+    # 1. Find heading line offsets
+    starts = [0]
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        if offset and _is_heading(line):
+            starts.append(offset)
+        offset += len(line)
+    starts.append(len(text))
+
+    # 2. Turn boundaries into spans, merging fragments that are too small to stand alone
+    spans = []
+    for s, e in zip(starts, starts[1:]):
+        if spans and (e - s < MIN_CLAUSE_CHARS or spans[-1][1] - spans[-1][0] < MIN_CLAUSE_CHARS):
+            spans[-1] = (spans[-1][0], e)
+        else:
+            spans.append((s, e))
+
+    # 3. Split oversized spans and attach a heading to every piece
+    clauses = []
+    for s, e in spans:
+        first_line = text[s:e].strip().split("\n", 1)[0].strip()
+        heading = first_line[:80] if _is_heading(first_line) else ""
+        for i, (ps, pe) in enumerate(_split_long(s, e, text)):
+            if not text[ps:pe].strip():
+                continue
+            clauses.append({
+                "heading": heading if i == 0 else (f"{heading} (cont.)" if heading else ""),
+                "start": ps,
+                "end": pe,
+            })
+    return clauses
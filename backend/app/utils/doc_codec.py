@@ -0,0 +1,113 @@
+import base64
+import hashlib
+import zlib
+from app.utils.clause_splitter import split_clauses
+from app.utils.legal_zdict import DICTIONARIES
+from app.utils.token_counter import count_tokens
+
+# Storage formats of documents rows:
+#   1 (or NULL): plain text in `content`
+#   2: text in `blocks`, zlib with the legal-v1 preset dictionary, plus `meta`
+# A new dictionary or codec gets a new number; readers keep every old one.
+LEGACY_FORMAT = 1
+CURRENT_FORMAT = 2
+FORMAT_DICTIONARIES = {2: "legal-v1"}
+
+BLOCK_CHARS = 4000  # Blocks are whole clauses, cut at the first clause start past this size
+
+
+class UnknownFormat(ValueError):
+    pass
+
+
+def _dictionary(format_version: int) -> bytes:
+    name = FORMAT_DICTIONARIES.get(format_version)
+    if name is None:
+        raise UnknownFormat(f"Unknown document storage format: {format_version}")
+    return DICTIONARIES[name]
+
+
+def compress_block(text: str, format_version: int = CURRENT_FORMAT) -> str:
+    packer = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=_dictionary(format_version))
+    return base64.b64encode(packer.compress(text.encode("utf-8")) + packer.flush()).decode("ascii")
+
+
+def decompress_block(data: str, format_version: int) -> str:
+    unpacker = zlib.decompressobj(-15, zdict=_dictionary(format_version))
+    return (unpacker.decompress(base64.b64decode(data)) + unpacker.flush()).decode("utf-8")
+
+
+def describe(text: str, content_hash: str = None, pages: list = None) -> dict:
+    """
+    The precomputed artifacts stored as `meta`, i.e. what readers would
+    otherwise recompute from the full text:
+        chars, tokens, text_sha256, content_hash,
+        pages    - char offset where each PDF page starts (None for DOCX/TXT)
+        blocks   - [start, end) char range of each block
+        clauses  - columns "heading", "start", "end", "tokens", "block",
+                   one entry per clause (columnar: about half the JSON)
+    """
+    clauses = split_clauses(text)
+    cuts = [0]
+    for c in clauses:
+        if c["start"] - cuts[-1] >= BLOCK_CHARS:
+            cuts.append(c["start"])
+    if len(text) > cuts[-1] or not text:
+        cuts.append(len(text))
+    ranges = list(zip(cuts, cuts[1:]))
+
+    columns = {"heading": [], "start": [], "end": [], "tokens": [], "block": []}
+    block_of = 0
+    for c in clauses:
+        while c["start"] >= ranges[block_of][1]:
+            block_of += 1
+        for key in ("heading", "start", "end"):
+            columns[key].append(c[key])
+        columns["tokens"].append(count_tokens(text[c["start"]:c["end"]]))
+        columns["block"].append(block_of)
+
+    meta = {
+        "chars": len(text),
+        "tokens": sum(columns["tokens"]),
+        "text_sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        "content_hash": content_hash,
+        "pages": pages,
+        "blocks": [list(r) for r in ranges],
+        "clauses": columns,
+    }
+    return meta
+
+
+def encode_document(text: str, content_hash: str = None, pages: list = None,
+                    format_version: int = CURRENT_FORMAT):
+    """
+    Returns (meta, blocks) for a documents row. `blocks` is a list of
+    base64 raw-deflate strings, one per meta["blocks"] range. Blocks hold
+    whole clauses, so one clause is readable by fetching one block.
+    """
+    meta = describe(text, content_hash, pages)
+    return meta, [compress_block(text[s:e], format_version) for s, e in meta["blocks"]]
+
+
+def decode_document(blocks: list, format_version: int) -> str:
+    return "".join(decompress_block(b, format_version) for b in blocks)
+
+
+def clause_blocks(meta: dict, clause_ids) -> list:
+    """Sorted block numbers holding the given clauses (out-of-range ids are ignored)."""
+    block = meta["clauses"]["block"]
+    return sorted({block[i] for i in clause_ids if 0 <= i < len(block)})
+
+
+def decode_clauses(meta: dict, blocks: dict, clause_ids, format_version: int) -> dict:
+    """`blocks` maps block number -> stored block; returns {clause_id: text}."""
+    texts = {n: decompress_block(data, format_version) for n, data in blocks.items()}
+    clauses = meta["clauses"]
+    out = {}
+    for i in clause_ids:
+        if not 0 <= i < len(clauses["block"]):
+            continue
+        block = clauses["block"][i]
+        base = meta["blocks"][block][0]
+        out[i] = texts[block][clauses["start"][i] - base:clauses["end"][i] - base]
+    return out
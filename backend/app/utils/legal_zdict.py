@@ -0,0 +1,164 @@
+import re
+from collections import Counter
+
+# Preset dictionaries for zlib (zdict) used by doc_codec. A dictionary primes
+# the compressor's 32 KB window, so boilerplate in even a 4 KB block becomes
+# back-references from its first occurrence. Stored documents name the format
+# version they were written with and every version's dictionary stays here
+# forever: changing a published dictionary would corrupt existing rows.
+#
+# LEGAL_V1 was built with `train_dictionary` over Indian commercial contracts
+# (leases, NDAs, service and employment agreements) and trimmed by hand.
+# zlib matches nearer the end of the dictionary more cheaply, so the most
+# frequent phrases come last.
+
+_LEGAL_V1_PHRASES = """
+Schedule Annexure Exhibit Appendix Recitals WHEREAS NOW THEREFORE IN WITNESS WHEREOF the parties hereto have
+set their respective hands on the day, month and year first above written. Signed, sealed and delivered by
+the within named in the presence of Witnesses: Name: Designation: Authorised Signatory Place: Date:
+This Agreement is made and executed at on this day of between (hereinafter referred to as the "Company",
+which expression shall, unless repugnant to the context or meaning thereof, be deemed to mean and include
+its successors and permitted assigns) of the One Part AND of the Other Part. The Company and the Service
+Provider are hereinafter individually referred to as a "Party" and collectively as the "Parties".
+a company incorporated under the Companies Act, 2013, having its registered office at
+a limited liability partnership registered under the Limited Liability Partnership Act, 2008
+Landlord Tenant Licensor Licensee Lessor Lessee Employer Employee Vendor Purchaser Buyer Seller Client
+Consultant Contractor Disclosing Party Receiving Party Service Provider Effective Date Commencement Date
+Premises Property Services Deliverables Fees Consideration Term Lock-in Period Notice Period Security Deposit
+monthly rent maintenance charges society charges electricity and water charges property tax stamp duty and
+registration charges shall be borne equally by the Parties Goods and Services Tax (GST) as applicable
+Indian Contract Act, 1872 Arbitration and Conciliation Act, 1996 Information Technology Act, 2000
+Transfer of Property Act, 1882 Specific Relief Act, 1963 Indian Stamp Act, 1899 Registration Act, 1908
+Industrial Disputes Act, 1947 Code of Civil Procedure, 1908 Digital Personal Data Protection Act, 2023
+Rs. lakh crore rupees per annum per month calendar month working days business days days' prior written notice
+DEFINITIONS AND INTERPRETATION In this Agreement, unless the context otherwise requires: capitalised terms
+shall have the meanings set out in this clause; words importing the singular include the plural and vice versa;
+words importing a gender include every gender; references to a person include a body corporate; headings are for
+convenience only and shall not affect the interpretation of this Agreement; the words "include" and "including"
+shall be construed without limitation; any reference to a statute includes any amendment or re-enactment thereof.
+TERM AND TERMINATION This Agreement shall commence on the Effective Date and shall continue in full force and
+effect for a period of months unless terminated earlier in accordance with its terms. Either Party may terminate
+this Agreement by giving days' prior written notice to the other Party. Either Party may terminate this Agreement
+forthwith by written notice if the other Party commits a material breach of any of its obligations under this
+Agreement which, if capable of remedy, is not remedied within days of receipt of a notice specifying the breach;
+becomes insolvent, makes an assignment for the benefit of creditors, or has a receiver or liquidator appointed.
+Upon expiry or termination of this Agreement for any reason, the Tenant shall quietly and peacefully hand over
+vacant possession of the Premises in the same condition as at the commencement, reasonable wear and tear excepted.
+Termination shall be without prejudice to any rights or remedies accrued to either Party prior to termination.
+PAYMENT The Client shall pay the Fees within days of receipt of a valid invoice. Any amount not paid when due shall
+carry interest at the rate of % per annum from the due date until the date of actual payment. All payments shall
+be made by bank transfer to the account designated in writing, subject to deduction of tax at source as required.
+The Tenant has deposited an interest-free refundable security deposit which shall be refunded within days of the
+expiry or termination of this Agreement, after deducting any arrears of rent, charges or damages, if any.
+CONFIDENTIALITY Each Party shall keep confidential all Confidential Information disclosed by the other Party and
+shall not, without the prior written consent of the Disclosing Party, disclose it to any third party or use it for
+any purpose other than the performance of this Agreement. "Confidential Information" means all information,
+whether written, oral or electronic, relating to the business, customers, finances, trade secrets, know-how,
+technology, products or affairs of a Party, but does not include information which is or becomes publicly available
+other than through a breach of this Agreement, was lawfully in the possession of the Receiving Party before
+disclosure, is independently developed, or is required to be disclosed by law, regulation or order of a court.
+The obligations under this clause shall survive the termination of this Agreement for a period of years.
+INTELLECTUAL PROPERTY All intellectual property rights, including copyright, patents, trademarks, designs and
+trade secrets, in the Deliverables shall vest in and belong absolutely to the Client upon payment in full.
+INDEMNITY The Service Provider shall indemnify, defend and hold harmless the Client, its directors, officers,
+employees and agents from and against any and all losses, damages, liabilities, claims, costs and expenses
+(including reasonable legal fees) arising out of or in connection with any breach of this Agreement, negligence,
+wilful misconduct or fraud, or any violation of applicable law by the Service Provider or its personnel.
+LIMITATION OF LIABILITY Notwithstanding anything contained in this Agreement, neither Party shall be liable to
+the other for any indirect, incidental, special, consequential or punitive damages, or for any loss of profits,
+revenue, business or goodwill, and the aggregate liability of either Party shall not exceed the total Fees paid.
+FORCE MAJEURE Neither Party shall be liable for any failure or delay in performance caused by events beyond its
+reasonable control, including acts of God, flood, fire, earthquake, epidemic, pandemic, war, riot, strike,
+lockout or any act of government, provided that the affected Party notifies the other Party promptly in writing.
+REPRESENTATIONS AND WARRANTIES Each Party represents and warrants that it has the full power and authority to
+enter into and perform this Agreement, and that the execution of this Agreement does not violate any law or any
+agreement to which it is a party.
+NON-SOLICITATION During the term of this Agreement and for a period of months thereafter, neither Party shall,
+directly or indirectly, solicit or employ any employee of the other Party without its prior written consent.
+ASSIGNMENT Neither Party shall assign, transfer or sub-contract any of its rights or obligations under this
+Agreement without the prior written consent of the other Party, which shall not be unreasonably withheld.
+NOTICES All notices under this Agreement shall be in writing and shall be delivered by hand, registered post
+acknowledgement due, speed post, courier or email to the addresses set out above, and shall be deemed to have been
+received on the date of delivery.
+SEVERABILITY If any provision of this Agreement is held to be invalid, illegal or unenforceable, the remaining
+provisions shall continue in full force and effect.
+WAIVER No failure or delay by either Party in exercising any right or remedy shall operate as a waiver thereof.
+ENTIRE AGREEMENT This Agreement constitutes the entire agreement between the Parties with respect to its subject
+matter and supersedes all prior agreements, understandings, negotiations and representations, whether written or
+oral. No amendment or modification of this Agreement shall be valid unless made in writing and signed by both Parties.
+RELATIONSHIP OF THE PARTIES Nothing in this Agreement shall be construed as creating a partnership, joint venture,
+agency or employment relationship between the Parties.
+COUNTERPARTS This Agreement may be executed in any number of counterparts, each of which shall be deemed an original.
+GOVERNING LAW AND JURISDICTION This Agreement shall be governed by and construed in accordance with the laws of
+India, and subject to the arbitration clause, the courts at shall have exclusive jurisdiction over all matters.
+DISPUTE RESOLUTION AND ARBITRATION Any dispute, controversy or claim arising out of or relating to this Agreement,
+including its validity, interpretation, breach or termination, shall first be attempted to be resolved amicably by
+mutual negotiation, failing which it shall be referred to and finally resolved by arbitration by a sole arbitrator
+appointed by mutual consent in accordance with the Arbitration and Conciliation Act, 1996. The seat and venue of
+arbitration shall be and the language of arbitration shall be English. The award shall be final and binding.
+PENALTY Any breach of the lock-in period shall attract a penalty equal to months' rent, payable as liquidated
+damages and not as a penalty, which the Parties agree is a genuine pre-estimate of the loss likely to be suffered.
+in accordance with the terms and conditions of this Agreement
+the Parties agree as follows:
+subject to the provisions of this Agreement
+notwithstanding anything to the contrary contained herein
+without prejudice to any other right or remedy available under this Agreement or at law
+in respect of in relation to in connection with arising out of or in connection with
+including but not limited to
+prior written consent of the other Party
+shall not be unreasonably withheld or delayed
+shall be entitled to
+shall be liable to
+shall be responsible for
+on or before the day of each calendar month
+for the time being in force
+from time to time
+provided that
+the other Party
+of this Agreement
+under this Agreement
+this Agreement
+the Parties
+shall not
+shall be
+"""
+
+LEGAL_V1 = " ".join(_LEGAL_V1_PHRASES.split()).encode("utf-8")
+
+DICTIONARIES = {"legal-v1": LEGAL_V1}
+
+NGRAM_RE = re.compile(r"\S+")
+
+
+def train_dictionary(texts, size: int = 16 * 1024, min_words: int = 3, max_words: int = 8,
+                     min_docs: int = 3) -> bytes:
+    """
+    Builds a zdict from sample documents: word n-grams that recur across at
+    least `min_docs` documents, ranked by (documents x length) and packed
+    until `size` bytes, most valuable last. Offline tool for drafting a new
+    dictionary version; the output still wants a read-through before it ships.
+    """
+    seen = Counter()
+    for text in texts:
+        words = NGRAM_RE.findall(text)
+        grams = set()
+        for n in range(min_words, max_words + 1):
+            for i in range(len(words) - n + 1):
+                grams.add(" ".join(words[i:i + n]))
+        seen.update(grams)  # counted once per document: boilerplate, not one doc's repetition
+
+    ranked = sorted(
+        ((docs * len(gram), gram) for gram, docs in seen.items() if docs >= min_docs),
+        reverse=True,
+    )
+    picked, used = [], 0
+    for _, gram in ranked:
+        # A longer phrase already picked covers its own sub-phrases
+        if any(gram in p for p in picked):
+            continue
+        cost = len(gram.encode("utf-8")) + 1
+        if used + cost > size:
+            break
+        picked.append(gram)
+        used += cost
+    return "\n".join(reversed(picked)).encode("utf-8")
@@ -1,29 +1,130 @@
-import pypdf
-from fastapi import UploadFile
+import asyncio
 import io
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+import pypdf
+from app.core.config import settings
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+PAGES_PER_TASK = 8  # First task also reports the page count; the rest fan out in parallel
+
+_executor = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    # Created lazily so importing the app (and Render cold start) doesn't fork workers
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.PDF_WORKERS)
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _extract_range(source, start: int, end: int, max_chars: int):
+    """
+    Runs in a worker process. Extracts pages [start, end) and stops early once
+    this range alone passes `max_chars`. Returns (texts, char_count, total_pages).
+    `source` is the PDF bytes, or the path of a spooled upload: workers then
+    mmap the file themselves, so the document isn't pickled to every task.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return _extract_pages(pypdf.PdfReader(view), start, end, max_chars)
+    return _extract_pages(pypdf.PdfReader(io.BytesIO(source)), start, end, max_chars)
+
+
+def _extract_pages(reader, start: int, end: int, max_chars: int):
+    total_pages = len(reader.pages)
+    texts, chars = [], 0
+    for page in reader.pages[start:min(end, total_pages)]:
+        extracted = page.extract_text()
+        if extracted:
+            texts.append(extracted)
+            chars += len(extracted) + 1
+            if max_chars and chars > max_chars:
+                break
+        else:
+            texts.append("")
+    return texts, chars, total_pages
+
+
+class TextLimitExceeded(ValueError):
+    pass
+
 
 class PDFParser:
     @staticmethod
-    async def parse(file: UploadFile) -> str:
-        content = await file.read()
-        pdf_file = io.BytesIO(content)
-        
+    async def parse(upload, max_chars: int = None, with_pages: bool = False):
+        """Parses a ReceivedFile in place: by path when spooled to disk, else its in-memory bytes."""
+        return await PDFParser.parse_bytes(upload.path or upload.content(), upload.filename, max_chars, with_pages)
+
+    @staticmethod
+    async def parse_bytes(content, filename: str = None, max_chars: int = None, with_pages: bool = False):
+        """`content` is the PDF bytes or a file path. with_pages: returns (text, page start offsets)."""
         try:
-            reader = pypdf.PdfReader(pdf_file)
-            text = ""
-            for i, page in enumerate(reader.pages):
-                extracted = page.extract_text()
-                if extracted:
-                    text += extracted + "\n"
-            
-            print(f"\n📄 --- PDF CONTENT PREVIEW ({file.filename}) ---")
-            print(text[:500])  #by this i will inspect first 500 characters of the parsed text
-            print("-------------------------------------------\n")
+            text, pages = await PDFParser.extract_text(content, max_chars, with_pages=True)
+            # Sizes only: document text never goes to the logs
+            logger.debug("PDF parsed", extra={"doc_name": filename, "chars": len(text)})
 
             if len(text.strip()) < 50:
                 raise ValueError("Parsed text is empty. This might be a scanned image PDF.")
-                
-            return text
+
+            return (text, pages) if with_pages else text
+        except TextLimitExceeded:
+            raise
         except Exception as e:
-            print(f"❌ PDF Parse Error: {e}")
-            raise ValueError(f"Could not read PDF: {str(e)}")
\ No newline at end of file
+            logger.warning("PDF parse failed", extra={"doc_name": filename, "error": str(e)})
+            raise ValueError(f"Could not read PDF: {str(e)}")
+
+    @staticmethod
+    async def extract_text(content, max_chars: int = None, with_pages: bool = False):
+        """
+        Extracts text off the event loop in a process pool. Large PDFs are split
+        into page ranges that run in parallel; as soon as the pages seen so far
+        pass `max_chars` the remaining work is cancelled and TextLimitExceeded raised.
+        with_pages: returns (text, offset in text where each page starts).
+        """
+        loop = asyncio.get_running_loop()
+        executor = _get_executor()
+
+        def submit(start, end):
+            return loop.run_in_executor(executor, _extract_range, content, start, end, max_chars)
+
+        texts, chars, total_pages = await submit(0, PAGES_PER_TASK)
+        results = {0: texts}
+        if max_chars and chars > max_chars:
+            raise TextLimitExceeded(f"Document text too long (over {max_chars} chars).")
+
+        pending = {submit(s, s + PAGES_PER_TASK): s for s in range(PAGES_PER_TASK, total_pages, PAGES_PER_TASK)}
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    texts, range_chars, _ = fut.result()
+                    results[pending.pop(fut)] = texts
+                    chars += range_chars
+                # Ranges finish out of order, but any subset over the limit means the whole doc is
+                if max_chars and chars > max_chars:
+                    raise TextLimitExceeded(f"Document text too long (over {max_chars} chars).")
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+        # Single join over all pages (no quadratic += copying)
+        pages = [page for start in sorted(results) for page in results[start]]
+        text = "".join(page + "\n" for page in pages if page)
+        if not with_pages:
+            return text
+        starts, offset = [], 0
+        for page in pages:
+            starts.append(offset)
+            offset += len(page) + 1 if page else 0
+        return text, starts
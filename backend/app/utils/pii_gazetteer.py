@@ -0,0 +1,26 @@
+# Common given names (Indian + English-speaking jurisdictions) used by the local
+# PII redactor. Extend per deployment with PII_GAZETTEER_PATH (one name per line).
+FIRST_NAMES = frozenset("""
+aarav aditya akash akshay amit amitabh anand anil anjali ankit anita anjana anuj arjun arun aruna
+arvind ashok ayesha deepak deepika dev devika dinesh divya gaurav geeta gita harish hemant indira
+ishaan jaya karan kavita kiran krishna kunal lakshmi madhu mahesh manish manoj meena meera mohan
+mukesh nandini naveen neha nikhil nisha pankaj pooja prakash pranav prasad preeti priya rahul raj
+rajesh rajiv rakesh ramesh ravi rekha rohit sachin sanjay santosh sarita shalini shweta siddharth
+sneha sonia sunil sunita suresh swati tanvi uma usha varun vijay vikas vikram vinod vishal yash
+aaron adam alan albert alexander alice amanda amy andrew angela anna anthony barbara benjamin brian
+carol catherine charles christine christopher daniel david deborah dennis donald dorothy edward
+elizabeth emily emma eric frank gary george gregory hannah harry helen henry jack james jane jason
+jennifer jessica john jonathan joseph joshua julia karen kenneth kevin laura linda lisa margaret
+maria mary matthew michael michelle nancy nicholas olivia patricia paul peter rachel raymond rebecca
+richard robert ronald ruth ryan samuel sandra sarah scott sharon sophia stephen steven susan thomas
+timothy victoria walter william
+""".split())
+
+# Given names that are also ordinary words in contracts ("Will", "May", "Grant"...).
+# The redactor matches them too, but only redacts them when an honorific or a
+# following surname confirms them.
+AMBIGUOUS_NAMES = frozenset("""
+will may june grant bill mark rose faith hope joy dawn art chase sterling
+""".split())
+
+HONORIFICS = ("mr", "mrs", "ms", "miss", "dr", "shri", "smt", "sri", "kumari", "prof", "adv")
@@ -0,0 +1,96 @@
+import asyncio
+import codecs
+import io
+import zipfile
+from xml.etree.ElementTree import iterparse
+from app.utils.pdf_parser import PDFParser, TextLimitExceeded
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_T, W_TAB, W_BR, W_CR, W_P = (W_NS + tag for tag in ("t", "tab", "br", "cr", "p"))
+
+
+def extract_txt(content, max_chars: int = None) -> str:
+    """
+    Plain text needs no parsing, only decoding (BOM-aware, with a lenient fallback).
+    `content` may be any bytes-like object, e.g. an mmap of a spooled upload.
+    """
+    # UTF-8 uses at most 4 bytes per char, so this many bytes can't fit the limit
+    if max_chars and len(content) > max_chars * 4:
+        raise TextLimitExceeded(f"Document text too long (over {max_chars} chars).")
+
+    if bytes(content[:2]) in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+        text = codecs.decode(content, "utf-16")
+    else:
+        try:
+            text = codecs.decode(content, "utf-8-sig")
+        except UnicodeDecodeError:
+            text = codecs.decode(content, "cp1252", errors="replace")
+
+    if max_chars and len(text) > max_chars:
+        raise TextLimitExceeded(f"Document text too long (over {max_chars} chars).")
+    return text.replace("\r\n", "\n")
+
+
+def extract_docx(content, max_chars: int = None) -> str:
+    """
+    Streams word/document.xml straight out of the zip and keeps only run text,
+    tabs and breaks. Elements are cleared per paragraph so memory stays flat.
+    `content` is the bytes, or the path of a spooled upload (read in place).
+    """
+    try:
+        archive = zipfile.ZipFile(content if isinstance(content, str) else io.BytesIO(content))
+        stream = archive.open("word/document.xml")
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ValueError(f"Could not read DOCX: {str(e)}")
+
+    parts, chars = [], 0
+    with archive, stream:
+        for _, elem in iterparse(stream, events=("end",)):
+            tag = elem.tag
+            if tag == W_T:
+                if elem.text:
+                    parts.append(elem.text)
+                    chars += len(elem.text)
+            elif tag == W_TAB:
+                parts.append("\t")
+            elif tag in (W_BR, W_CR):
+                parts.append("\n")
+            elif tag == W_P:
+                parts.append("\n")
+                chars += 1
+                elem.clear()
+                if max_chars and chars > max_chars:
+                    raise TextLimitExceeded(f"Document text too long (over {max_chars} chars).")
+    return "".join(parts)
+
+
+class TextExtractor:
+    """Routes each upload to the cheapest extractor for its format."""
+
+    @staticmethod
+    async def parse(upload, max_chars: int = None, with_pages: bool = False):
+        """
+        Extracts a ReceivedFile where it lies (memory or spooled temp file), no extra copy.
+        with_pages: returns (text, page start offsets), the offsets being None for non-PDFs.
+        """
+        name = upload.filename.lower()
+        if name.endswith(".pdf"):
+            return await PDFParser.parse(upload, max_chars, with_pages)
+        if name.endswith(".docx"):
+            # zipfile seeks around the archive: give it the temp file itself
+            text = await TextExtractor.extract(upload.filename, upload.path or upload.content(), max_chars)
+        else:
+            text = await TextExtractor.extract(upload.filename, upload.content(), max_chars)
+        return (text, None) if with_pages else text
+
+    @staticmethod
+    async def extract(filename: str, content, max_chars: int = None) -> str:
+        name = (filename or "").lower()
+        if name.endswith(".pdf"):
+            return await PDFParser.parse_bytes(content, filename, max_chars)
+        if name.endswith(".txt"):
+            return extract_txt(content, max_chars)
+        if name.endswith(".docx"):
+            # Zip inflate + XML parsing is CPU work; keep it off the event loop
+            return await asyncio.to_thread(extract_docx, content, max_chars)
+        raise ValueError(f"Unsupported file type: {filename}")
@@ -0,0 +1,37 @@
+import re
+
+# Fast local token estimate for Llama-3 style BPE vocabularies. Runs as one
+# regex pass with no tokenizer download. It errs on the high side (long words
+# count as several pieces, non-ASCII counts one token per character), which is
+# the safe direction when fitting a context window.
+PIECE_RE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d\x80-\U0010ffff]|[\x80-\U0010ffff]|\n")
+CHARS_PER_WORD_TOKEN = 6
+
+
+def _piece_tokens(piece: str) -> int:
+    if len(piece) <= CHARS_PER_WORD_TOKEN:
+        return 1
+    return -(-len(piece) // CHARS_PER_WORD_TOKEN)
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return sum(_piece_tokens(p) for p in PIECE_RE.findall(text))
+
+
+def count_message_tokens(messages: list) -> int:
+    """Chat-format overhead included: ~4 tokens of role/separator per message."""
+    return sum(count_tokens(m["content"]) + 4 for m in messages)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of `text` whose estimate fits in `max_tokens`."""
+    if max_tokens <= 0:
+        return ""
+    used = 0
+    for m in PIECE_RE.finditer(text):
+        used += _piece_tokens(m.group())
+        if used > max_tokens:
+            return text[:m.start()]
+    return text
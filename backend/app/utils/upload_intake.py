@@ -0,0 +1,159 @@
+import hashlib
+import mmap
+import tempfile
+from python_multipart.multipart import MultipartParser, parse_options_header
+from app.core.config import settings
+
+MULTIPART_OVERHEAD = 64 * 1024  # Boundaries + part headers allowed on top of the file bytes
+
+
+class UploadTooLarge(ValueError):
+    """The body or one file passed its size limit; the route answers 413."""
+
+
+class ReceivedFile:
+    """
+    One uploaded file, hashed as it arrives. Small files stay in memory; past
+    UPLOAD_SPOOL_BYTES the bytes go to a temp file that the parsers read via
+    mmap (or by path, from the PDF worker processes) instead of copying.
+    """
+
+    def __init__(self, filename: str, spool_bytes: int = None):
+        self.filename = filename
+        self.size = 0
+        self.spool_bytes = spool_bytes if spool_bytes is not None else settings.UPLOAD_SPOOL_BYTES
+        self._hash = hashlib.sha256()
+        self._chunks = []
+        self._data = b""
+        self._disk = None
+        self._mmap = None
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        self._hash.update(data)
+        if self._disk is None and self.size > self.spool_bytes:
+            self._disk = tempfile.NamedTemporaryFile(prefix="upload_")
+            self._disk.writelines(self._chunks)
+            self._chunks = []
+        # At most one ASGI chunk per call into the page cache: cheap enough for the loop
+        if self._disk is not None:
+            self._disk.write(data)
+        else:
+            self._chunks.append(data)
+
+    def finish(self):
+        if self._disk is not None:
+            self._disk.flush()
+        else:
+            self._data = b"".join(self._chunks)
+            self._chunks = []
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def path(self):
+        """Temp file path when spooled to disk, else None."""
+        return self._disk.name if self._disk is not None else None
+
+    def content(self):
+        """The whole file as a bytes-like object, without copying: bytes or a read-only mmap."""
+        if self._disk is None:
+            return self._data
+        if self._mmap is None:
+            self._mmap = mmap.mmap(self._disk.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._disk is not None:
+            self._disk.close()  # deletes the temp file
+            self._disk = None
+        self._chunks, self._data = [], b""
+
+
+async def receive_files(request, max_file_bytes: int, field: str = "file", max_files: int = 1,
+                        allowed_types: tuple = None) -> list:
+    """
+    Streams a multipart/form-data body straight into ReceivedFiles, without
+    Starlette's form spooling. It stops reading the moment a file passes
+    `max_file_bytes`, the body passes its total limit, or a part names a
+    disallowed file type. Parts other than `field` files are skipped.
+    """
+    limit = max_file_bytes * max_files + MULTIPART_OVERHEAD
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > limit:
+        raise UploadTooLarge(f"Upload too large. Limit is {max_file_bytes // (1024 * 1024)}MB per file.")
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected a multipart/form-data upload.")
+
+    files = []
+    part = {"headers": [], "name": b"", "value": b"", "file": None}
+
+    def on_part_begin():
+        part.update(headers=[], file=None)
+
+    def on_header_field(data, start, end):
+        part["name"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"].append((part["name"].lower(), part["value"]))
+        part.update(name=b"", value=b"")
+
+    def on_headers_finished():
+        disposition = dict(part["headers"]).get(b"content-disposition", b"")
+        _, options = parse_options_header(disposition)
+        if options.get(b"name", b"").decode("utf-8", "replace") != field or b"filename" not in options:
+            return
+        filename = options[b"filename"].decode("utf-8", "replace")
+        if allowed_types and not filename.lower().endswith(allowed_types):
+            raise ValueError(f"Invalid file type. Allowed: {', '.join(allowed_types)}")
+        if len(files) >= max_files:
+            raise ValueError(f"Too many files. Limit is {max_files}.")
+        part["file"] = ReceivedFile(filename)
+        files.append(part["file"])
+
+    def on_part_data(data, start, end):
+        received = part["file"]
+        if received is None:
+            return
+        if received.size + (end - start) > max_file_bytes:
+            raise UploadTooLarge(
+                f"File too large ({received.filename}). Limit is {max_file_bytes // (1024 * 1024)}MB."
+            )
+        received.write(data[start:end])
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+    total = 0
+    try:
+        async for chunk in request.stream():
+            total += len(chunk)
+            if total > limit:
+                raise UploadTooLarge(f"Upload too large. Limit is {max_file_bytes // (1024 * 1024)}MB per file.")
+            if chunk:
+                parser.write(chunk)
+        parser.finalize()
+        if not files:
+            raise ValueError(f"No file in form field '{field}'.")
+        for received in files:
+            received.finish()
+    except BaseException:
+        for received in files:
+            received.close()
+        raise
+    return files
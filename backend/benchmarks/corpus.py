@@ -0,0 +1,132 @@
+import io
+import os
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+# Deterministic synthetic contracts for benchmarks. Real samples can be used
+# instead with --corpus <dir> (any .pdf / .docx / .txt files).
+
+PARTIES = ["Acme Estates Pvt. Ltd.", "Northwind Traders LLP", "Globex Services Ltd.", "Initech Software Pvt. Ltd."]
+CLAUSES = [
+    ("DEFINITIONS", "In this Agreement, unless the context otherwise requires, capitalised terms shall have the meanings "
+                    "set out in this clause and words importing the singular include the plural."),
+    ("TERM", "This Agreement commences on the Effective Date and continues for a period of {n} months unless "
+             "terminated earlier in accordance with its terms."),
+    ("RENT AND PAYMENT", "The Tenant shall pay a monthly rent of Rs. {amount} on or before the {n}th day of each "
+                         "calendar month, failing which interest at {pct}% per annum shall accrue on overdue amounts."),
+    ("SECURITY DEPOSIT", "The Tenant has deposited Rs. {amount} as an interest-free refundable security deposit, "
+                         "to be returned within {n} days of the expiry or termination of this Agreement."),
+    ("CONFIDENTIALITY", "Each party shall keep confidential all Confidential Information of the other party and shall "
+                        "not disclose it to any third party for a period of {n} years after termination."),
+    ("TERMINATION", "Either party may terminate this Agreement by giving {n} days' prior written notice. The Landlord "
+                    "may terminate forthwith if the Tenant commits a material breach that remains unremedied."),
+    ("PENALTY", "Any breach of the lock-in period shall attract a penalty equal to {n} months' rent, payable as "
+                "liquidated damages and not as a penalty."),
+    ("INDEMNITY", "The Service Provider shall indemnify and hold harmless the Client against all losses, claims and "
+                  "expenses arising from any negligence or wilful misconduct, capped at Rs. {amount}."),
+    ("GOVERNING LAW", "This Agreement shall be governed by the laws of India and the courts at {city} shall have "
+                      "exclusive jurisdiction."),
+    ("ARBITRATION", "Any dispute shall be referred to a sole arbitrator under the Arbitration and Conciliation Act, "
+                    "1996; the seat of arbitration shall be {city}."),
+]
+CITIES = ["Mumbai", "New Delhi", "Bengaluru", "Chennai", "Pune"]
+
+
+def contract_text(seed: int, clauses: int = 20, paragraphs: int = 3) -> str:
+    rng = random.Random(seed)
+    lines = [f"AGREEMENT between {rng.choice(PARTIES)} and {rng.choice(PARTIES)}", ""]
+    for i in range(1, clauses + 1):
+        heading, body = CLAUSES[(i - 1) % len(CLAUSES)]
+        lines.append(f"{i}. {heading}")
+        for p in range(paragraphs):
+            lines.append(f"{i}.{p + 1} " + body.format(
+                n=rng.randint(2, 36), amount=f"{rng.randint(10, 900) * 1000:,}",
+                pct=rng.randint(6, 24), city=rng.choice(CITIES)
+            ))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def to_pdf(text: str, lines_per_page: int = 50) -> bytes:
+    """Minimal single-font PDF (Helvetica, WinAnsi) with one text object per page."""
+    rows = []
+    for line in text.splitlines():
+        while len(line) > 110:
+            cut = line.rfind(" ", 0, 110)
+            cut = cut if cut > 0 else 110
+            rows.append(line[:cut])
+            line = line[cut:].lstrip()
+        rows.append(line)
+    pages = [rows[i:i + lines_per_page] for i in range(0, len(rows), lines_per_page)] or [[]]
+
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages)))
+    objs.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    for i, page in enumerate(pages):
+        objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        shown = " ".join(
+            "(" + r.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") '" for r in page
+        )
+        stream = f"BT /F1 10 Tf 40 770 Td 14 TL {shown} ET".encode("cp1252", "replace")
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objs):
+        offsets.append(out.tell())
+        out.write(f"{i + 1} 0 obj\n".encode() + obj + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode())
+    out.write(b"".join(f"{o:010d} 00000 n \n".encode() for o in offsets))
+    out.write(f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def to_docx(text: str) -> bytes:
+    body = "".join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r></w:p>' for line in text.splitlines()
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{body}</w:body></w:document>"
+    )
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml",
+                   '<?xml version="1.0" encoding="UTF-8"?>'
+                   '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Override PartName="/word/document.xml" ContentType="application/'
+                   'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+        z.writestr("word/document.xml", document)
+    return buf.getvalue()
+
+
+def synthetic_corpus(sizes=(10, 30, 60)):
+    """[(filename, bytes, text)] - one PDF, DOCX and TXT per size (in clauses)."""
+    corpus = []
+    for n, clauses in enumerate(sizes):
+        text = contract_text(seed=n, clauses=clauses)
+        corpus.append((f"contract_{clauses}.pdf", to_pdf(text), text))
+        corpus.append((f"contract_{clauses}.docx", to_docx(text), text))
+        corpus.append((f"contract_{clauses}.txt", text.encode("utf-8"), text))
+    return corpus
+
+
+def load_corpus(path: str = None):
+    """Files from `path` (text extracted lazily by the caller), or the synthetic corpus."""
+    if not path:
+        return synthetic_corpus()
+    corpus = []
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith((".pdf", ".docx", ".txt")):
+            with open(os.path.join(path, name), "rb") as f:
+                corpus.append((name, f.read(), None))
+    return corpus
@@ -0,0 +1,194 @@
+import asyncio
+import random
+import threading
+import time
+import types
+
+# Local stand-ins for the two network dependencies, with latency and error
+# injection. They implement only the call shapes the app uses.
+
+
+class InjectedError(Exception):
+    pass
+
+
+class Faults:
+    """Latency (mean seconds, +-50% jitter) and error probability for one fake."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        with self._lock:
+            delay = self.latency * self._rng.uniform(0.5, 1.5) if self.latency else 0.0
+            fail = self._rng.random() < self.error_rate
+        return delay, fail
+
+
+# --- Supabase (sync client, called from worker threads) ---
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table: str):
+        self.db, self.table = db, table
+        self.op, self.payload, self.filters = "select", None, []
+        self.limit_n, self.order_key, self.desc = None, None, False
+        self.upsert_opts = {}
+        self.columns = None
+
+    def select(self, *columns, **kwargs):
+        self.op = "select"
+        spec = ",".join(columns).strip()
+        if spec and spec != "*":
+            self.columns = [c.strip() for c in spec.split(",") if c.strip()]
+        return self
+
+    def insert(self, payload):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict: str = "id", ignore_duplicates: bool = False, **kwargs):
+        self.op, self.payload = "upsert", payload
+        self.upsert_opts = {"on_conflict": on_conflict, "ignore_duplicates": ignore_duplicates}
+        return self
+
+    def update(self, payload):
+        self.op, self.payload = "update", payload
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column, desc: bool = False):
+        self.order_key, self.desc = column, desc
+        return self
+
+    def limit(self, n: int):
+        self.limit_n = n
+        return self
+
+    def execute(self):
+        delay, fail = self.db.faults.draw()
+        if delay:
+            time.sleep(delay)  # the real client blocks its thread too
+        if fail:
+            raise InjectedError(f"injected supabase error on {self.table}.{self.op}")
+        with self.db.lock:
+            self.db.calls[f"{self.table}.{self.op}"] = self.db.calls.get(f"{self.table}.{self.op}", 0) + 1
+            return _Result(self._apply(self.db.tables.setdefault(self.table, [])))
+
+    def _apply(self, rows: list):
+        if self.op in ("insert", "upsert"):
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            key = self.upsert_opts.get("on_conflict", "id")
+            for new in payload:
+                existing = next((r for r in rows if key in new and r.get(key) == new[key]), None)
+                if existing is not None:
+                    if self.op == "insert":
+                        raise InjectedError(f"duplicate key {new[key]} in {self.table}")
+                    if not self.upsert_opts.get("ignore_duplicates"):
+                        existing.update(new)
+                    continue
+                if self.op == "insert" and "content_hash" in new and any(
+                    r.get("content_hash") == new["content_hash"] for r in rows
+                ):
+                    raise InjectedError("duplicate content_hash")
+                rows.append(dict(new))
+            return payload
+
+        matched = [r for r in rows if all(f(r) for f in self.filters)]
+        if self.op == "update":
+            for r in matched:
+                r.update(self.payload)
+            return matched
+        if self.order_key:
+            matched.sort(key=lambda r: r.get(self.order_key) or "", reverse=self.desc)
+        if self.limit_n is not None:
+            matched = matched[:self.limit_n]
+        return [self._project(r) for r in matched]
+
+    def _project(self, row: dict) -> dict:
+        """PostgREST-style select: "col", "alias:col" and "alias:col->>n" (array element as text)."""
+        if self.columns is None:
+            return dict(row)
+        out = {}
+        for spec in self.columns:
+            alias, _, path = spec.rpartition(":")
+            column, _, index = path.partition("->>")
+            value = row.get(column)
+            if index:
+                value = value[int(index)] if isinstance(value, list) and int(index) < len(value) else None
+            out[alias or column] = value
+        return out
+
+
+class FakeSupabase:
+    """`create_client(...)` replacement: in-memory tables behind the `table(...)` query builder."""
+
+    def __init__(self, faults: Faults = None):
+        self.faults = faults or Faults()
+        self.tables = {}
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def table(self, name: str):
+        return _Query(self, name)
+
+
+# --- Groq (AsyncGroq: client.chat.completions.create) ---
+
+def _chunk(text: str):
+    message = types.SimpleNamespace(content=text)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message, delta=message)])
+
+
+class _FakeStream:
+    """Like groq's AsyncStream: async-iterable chunks plus an async close()."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def __aiter__(self):
+        return self._chunks
+
+    async def close(self):
+        await self._chunks.aclose()
+
+
+class FakeAsyncGroq:
+    ANSWER = ("Under clause 7 the penalty for breaching the lock-in period is three months' rent, "
+              "payable as liquidated damages. Disclaimer: I am an AI, not a lawyer.")
+
+    def __init__(self, faults: Faults = None, tokens_per_second: float = 500.0):
+        self.faults = faults or Faults()
+        self.tokens_per_second = tokens_per_second
+        self.chat = types.SimpleNamespace(completions=self)
+        self.calls = 0
+
+    async def create(self, messages, model: str, stream: bool = False, **kwargs):
+        self.calls += 1
+        delay, fail = self.faults.draw()
+        await asyncio.sleep(delay)  # time to first token
+        if fail:
+            raise InjectedError(f"injected groq error ({model})")
+        if not stream:
+            return _chunk(self.ANSWER)
+
+        async def tokens():
+            for word in self.ANSWER.split(" "):
+                await asyncio.sleep(1.0 / self.tokens_per_second)
+                yield _chunk(word + " ")
+        return _FakeStream(tokens())
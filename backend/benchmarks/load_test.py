@@ -0,0 +1,228 @@
+"""
+Offline load test: runs app.main:app in-process against FakeSupabase and
+FakeAsyncGroq and drives concurrent /upload and /chat traffic.
+
+    cd backend
+    python -m benchmarks.load_test --requests 500 --concurrency 32 --llm-latency-ms 400
+
+Reports throughput and p50/p95/p99 per endpoint; --json writes the same
+numbers to a file so runs can be compared.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import tempfile
+import time
+from benchmarks.corpus import contract_text, to_docx, to_pdf
+from benchmarks.fakes import Faults, FakeAsyncGroq, FakeSupabase
+
+QUESTIONS = [
+    "What is the termination clause?",
+    "What is the penalty for breaking the lock-in?",
+    "How much is the security deposit and when is it refunded?",
+    "Which courts have jurisdiction?",
+    "Summarise the confidentiality obligations.",
+    "Is there an arbitration clause?",
+    "What interest applies to late rent?",
+]
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+def build_app(args, workdir: str):
+    """Points settings at scratch dirs and swaps in the fakes before the app is imported."""
+    os.environ.setdefault("GROQ_API_KEY", "offline")
+    os.environ.setdefault("SUPABASE_URL", "http://supabase.invalid")
+    os.environ.setdefault("SUPABASE_KEY", "offline")
+    os.environ["CLAUSE_INDEX_DIR"] = os.path.join(workdir, "clause_index")
+    os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+    os.environ["ANSWER_CACHE_BACKEND"] = "memory" if args.answer_cache else "off"
+    # Every bench request comes from one IP; rate limits/quota only when asked for
+    os.environ["RATE_LIMIT_ENABLED"] = "true" if args.admission else "false"
+    os.environ["QUOTA_PATH"] = ""
+    os.environ.setdefault("LOG_LEVEL", "INFO" if args.verbose else "WARNING")
+
+    db = FakeSupabase(Faults(args.db_latency_ms / 1000, args.db_error_rate, seed=1))
+    groq = FakeAsyncGroq(Faults(args.llm_latency_ms / 1000, args.llm_error_rate, seed=2))
+
+    import app.services.session_manager as session_manager
+    session_manager._client = db
+
+    from app.core.config import settings
+    from app.services import provider_gateway as pg
+    pg._gateway = pg.ProviderGateway([
+        pg.GroqProvider(groq, settings.LLM_MODEL, name=pg.GROQ),
+        pg.GroqProvider(groq, settings.LLM_FALLBACK_MODEL, name=pg.GROQ_FALLBACK),
+    ])
+
+    from app.main import app
+    return app, db, groq
+
+
+def make_upload(rng: random.Random):
+    text = contract_text(seed=rng.randrange(1 << 30), clauses=rng.choice([10, 25, 40]))
+    kind = rng.choice(["pdf", "docx", "txt"])
+    content = {"pdf": to_pdf, "docx": to_docx, "txt": lambda t: t.encode("utf-8")}[kind](text)
+    return f"bench_{rng.randrange(1 << 30)}.{kind}", content
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+
+    def record(self, endpoint: str, seconds: float, ok: bool, status):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        self.errors[endpoint] = self.errors.get(endpoint, 0) + (0 if ok else 1)
+        key = f"{endpoint} {status}"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def report(self, wall: float) -> dict:
+        out = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            out[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "throughput_rps": round(len(values) / wall, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1),
+            }
+        return out
+
+
+async def run(args):
+    import httpx
+
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    app, db, groq = build_app(args, workdir)
+    from app.core.config import settings
+    prefix = settings.API_V1_STR
+    rng = random.Random(args.seed)
+    stats = Stats()
+    doc_ids = []
+
+    async def upload(client):
+        filename, content = make_upload(rng)
+        start = time.perf_counter()
+        try:
+            res = await client.post(f"{prefix}/upload", files={"file": (filename, content)})
+            body = res.json()
+            ok = res.status_code == 200 and body.get("status") == "success"
+            if ok:
+                doc_ids.append(body["doc_id"])
+            status = res.status_code
+        except Exception as e:
+            ok, status = False, type(e).__name__
+        stats.record("POST /upload", time.perf_counter() - start, ok, status)
+
+    async def chat(client):
+        docs = rng.sample(doc_ids, k=min(len(doc_ids), rng.choice([1, 1, 2])))
+        payload = {
+            "session_id": f"bench-session-{rng.randrange(args.sessions)}",
+            "document_id": ",".join(docs) or "general",
+            "message": rng.choice(QUESTIONS),
+        }
+        endpoint = "/chat/stream" if args.stream else "/chat"
+        start = time.perf_counter()
+        try:
+            res = await client.post(f"{prefix}{endpoint}", json=payload)
+            if args.stream:
+                ok = res.status_code == 200 and "event: done" in res.text
+            else:
+                ok = res.status_code == 200 and not res.json().get("response", "").startswith("System Error")
+            status = res.status_code
+        except Exception as e:
+            ok, status = False, type(e).__name__
+        stats.record(f"POST {endpoint}", time.perf_counter() - start, ok, status)
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            # Warm-up: a few documents to chat about (not counted)
+            for _ in range(args.warmup_docs):
+                await upload(client)
+            stats = Stats()
+
+            remaining = args.requests
+
+            async def worker():
+                nonlocal remaining
+                while remaining > 0:
+                    remaining -= 1
+                    if rng.random() < args.upload_ratio or not doc_ids:
+                        await upload(client)
+                    else:
+                        await chat(client)
+
+            wall_start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            wall = time.perf_counter() - wall_start
+
+    report = {
+        "config": vars(args),
+        "wall_seconds": round(wall, 2),
+        "endpoints": stats.report(wall),
+        "statuses": stats.statuses,
+        "supabase_calls": db.calls,
+        "groq_calls": groq.calls,
+    }
+    if args.metrics:
+        from app.core.metrics import render_metrics
+        report["metrics"] = render_metrics()
+    return report
+
+
+def print_report(report: dict):
+    print(f"\nWall time: {report['wall_seconds']}s  |  Groq calls: {report['groq_calls']}")
+    print(f"{'endpoint':<20}{'reqs':>6}{'errs':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, r in report["endpoints"].items():
+        print(f"{endpoint:<20}{r['requests']:>6}{r['errors']:>6}{r['throughput_rps']:>9}"
+              f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}")
+    print("Statuses:", report["statuses"])
+    print("Supabase calls:", report["supabase_calls"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test with fake Groq + Supabase")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--upload-ratio", type=float, default=0.1, help="share of requests that are uploads")
+    parser.add_argument("--stream", action="store_true", help="use /chat/stream instead of /chat")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--warmup-docs", type=int, default=5)
+    parser.add_argument("--db-latency-ms", type=float, default=20)
+    parser.add_argument("--db-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--answer-cache", action="store_true", help="leave the answer cache on")
+    parser.add_argument("--admission", action="store_true", help="enforce RATE_LIMIT / DAILY_QUOTA (expect 429s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--metrics", action="store_true", help="include the /metrics exposition in the report")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output")
+    args = parser.parse_args()
+
+    # Keep the app's own output (logs go to stderr) out of the report unless asked
+    with open(os.devnull, "w") as devnull:
+        with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull):
+            report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Micro-benchmarks for the CPU-heavy steps of upload and chat, over a corpus of
+contracts (synthetic by default, or --corpus <dir> of real PDF/DOCX/TXT files).
+
+    cd backend
+    python -m benchmarks.micro --repeat 5 --json micro.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import tempfile
+import time
+from benchmarks.corpus import load_corpus
+
+
+def _env(workdir: str):
+    os.environ.setdefault("GROQ_API_KEY", "offline")
+    os.environ.setdefault("SUPABASE_URL", "http://supabase.invalid")
+    os.environ.setdefault("SUPABASE_KEY", "offline")
+    os.environ["CLAUSE_INDEX_DIR"] = os.path.join(workdir, "clause_index")
+    os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def timed(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "min_ms": round(min(samples) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+def run(args) -> dict:
+    _env(tempfile.mkdtemp(prefix="bench_micro_"))
+    from app.services.chat_service import SYSTEM_PROMPT
+    from app.services.clause_diff import ClauseAligner, align
+    from app.services.clause_index import ClauseIndex, ClauseIndexStore
+    from app.services.ingestion import chunk_document
+    from app.services.prompt_assembler import PromptAssembler
+    from app.services.sanitizer import DataSanitizer
+    from app.utils import doc_codec
+    from app.utils.pdf_parser import shutdown_executor
+    from app.utils.text_extractor import TextExtractor
+    from app.utils.token_counter import count_tokens
+
+    results = {}
+    texts = {}
+    loop = asyncio.new_event_loop()
+    try:
+        # 1. Extraction (PDFParser.parse for PDFs, the DOCX/TXT extractors otherwise)
+        for name, content, text in load_corpus(args.corpus):
+            def extract():
+                texts[name] = loop.run_until_complete(TextExtractor.extract(name, content))
+            extract()  # warm-up (process pool start, imports)
+            results[f"extract {name}"] = {**timed(extract, args.repeat), "bytes": len(content)}
+    finally:
+        loop.close()
+        shutdown_executor()
+
+    # 2. Per-document text processing
+    sanitizer = DataSanitizer()
+    for name, text in texts.items():
+        if not name.endswith(".txt") and args.corpus is None:
+            continue  # same text as the .txt twin; measured once
+        results[f"clause index {name}"] = timed(lambda: ClauseIndex.build(name, text), args.repeat)
+        results[f"chunk {name}"] = timed(lambda: chunk_document(name, text), args.repeat)
+        results[f"count tokens {name}"] = timed(lambda: count_tokens(text), args.repeat)
+        results[f"sanitize {name}"] = timed(lambda: sanitizer.sanitize(text), args.repeat)
+
+        # Stored size: plain `content` vs doc_codec blocks (+ meta), as JSON on the wire
+        meta, blocks = doc_codec.encode_document(text)
+        results[f"encode for storage {name}"] = {
+            **timed(lambda: doc_codec.encode_document(text), args.repeat),
+            "content_bytes": len(json.dumps(text)),
+            "blocks_bytes": len(json.dumps(blocks)),
+            "meta_bytes": len(json.dumps(meta, separators=(",", ":"))),
+        }
+        results[f"decode from storage {name}"] = timed(
+            lambda: doc_codec.decode_document(blocks, doc_codec.CURRENT_FORMAT), args.repeat
+        )
+
+    # 3. Prompt building: one and two documents under the default token budget
+    assembler = PromptAssembler(ClauseIndexStore())
+    history = [{"role": "user", "content": "What is the notice period?"},
+               {"role": "assistant", "content": "Thirty days' written notice under clause 6."}] * 3
+    docs = [(name, name, text) for name, text in texts.items() if text][:2]
+    question = "What is the penalty for breaking the lock-in period?"
+    for n in (1, 2):
+        subset = docs[:n]
+        assembler.assemble(SYSTEM_PROMPT, history, subset, question)  # builds clause indexes
+        results[f"assemble prompt ({n} doc)"] = timed(
+            lambda: assembler.assemble(SYSTEM_PROMPT, history, subset, question), args.repeat
+        )
+
+    # 4. Clause alignment for comparison questions (uncached), and the comparison prompt
+    if len(docs) == 2:
+        (id_a, _, text_a), (id_b, _, text_b) = docs
+        index_a, index_b = ClauseIndex.build(id_a, text_a), ClauseIndex.build(id_b, text_b)
+        results["align clauses (2 docs)"] = timed(lambda: align(index_a, text_a, index_b, text_b), args.repeat)
+        comparing = PromptAssembler(assembler.clause_index, aligner=ClauseAligner(assembler.clause_index))
+        compare = "Compare the termination clauses of these documents"
+        results["assemble comparison prompt (cached alignment)"] = timed(
+            lambda: comparing.assemble(SYSTEM_PROMPT, history, docs, compare), args.repeat
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for parsing and prompt building")
+    parser.add_argument("--corpus", help="directory of .pdf/.docx/.txt contracts (default: synthetic)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output")
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull:
+        with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull):
+            results = run(args)
+
+    width = max(len(k) for k in results)
+    print(f"{'benchmark':<{width}}  {'median ms':>10}{'min ms':>10}{'max ms':>10}")
+    for name, r in results.items():
+        extra = "  ".join(f"{k}={v}" for k, v in r.items() if not k.endswith("_ms"))
+        print(f"{name:<{width}}  {r['median_ms']:>10}{r['min_ms']:>10}{r['max_ms']:>10}  {extra}".rstrip())
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()